@@ -1,9 +1,17 @@
-from langchain_core.messages import SystemMessage
+import threading
+from typing import Literal
+
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 
 from langgraph.graph import START, StateGraph, MessagesState
-from langgraph.prebuilt import tools_condition, ToolNode
+from langgraph.prebuilt import tools_condition
+
+import arithmetic
+from parallel_tools import ParallelToolNode
+from tool_cache import cacheable
 
+@cacheable()
 def add(a: int, b: int) -> int:
     """Adds a and b.
 
@@ -13,6 +21,7 @@ def add(a: int, b: int) -> int:
     """
     return a + b
 
+@cacheable()
 def multiply(a: int, b: int) -> int:
     """Multiplies a and b.
 
@@ -22,6 +31,7 @@ def multiply(a: int, b: int) -> int:
     """
     return a * b
 
+@cacheable()
 def divide(a: int, b: int) -> float:
     """Divide a and b.
 
@@ -31,6 +41,7 @@ def divide(a: int, b: int) -> float:
     """
     return a / b
 
+# Pure tools: repeated calls with the same arguments are served from their cache
 tools = [add, multiply, divide]
 
 # Define LLM with bound tools
@@ -44,11 +55,41 @@ sys_msg = SystemMessage(content="You are a helpful assistant tasked with writing
 def assistant(state: MessagesState):
    return {"messages": [llm_with_tools.invoke([sys_msg] + state["messages"])]}
 
+# Fast path: plain arithmetic is answered with the tools directly, skipping both model round trips
+tools_by_name = {tool.__name__: tool for tool in tools}
+fast_path_counts = {"hits": 0, "misses": 0}
+fast_path_lock = threading.Lock()
+
+def fast_path_stats() -> dict:
+    with fast_path_lock:
+        lookups = fast_path_counts["hits"] + fast_path_counts["misses"]
+        return {**fast_path_counts, "hit_rate": fast_path_counts["hits"] / lookups if lookups else 0.0}
+
+def route_input(state: MessagesState) -> Literal["arithmetic", "assistant"]:
+    last = state["messages"][-1]
+    hit = isinstance(last, HumanMessage) and isinstance(last.content, str) and arithmetic.parse(last.content) is not None
+    with fast_path_lock:
+        fast_path_counts["hits" if hit else "misses"] += 1
+    return "arithmetic" if hit else "assistant"
+
+def solve_arithmetic(state: MessagesState):
+    # Same messages the agent loop would add: tool calls, tool results and the final answer
+    messages = arithmetic.solve(state["messages"][-1].content, tools_by_name)
+    if messages is None:
+        # Parsed, but e.g. divides by zero; let the model answer
+        with fast_path_lock:
+            fast_path_counts["hits"] -= 1
+            fast_path_counts["misses"] += 1
+        return {"messages": [llm_with_tools.invoke([sys_msg] + state["messages"])]}
+    return {"messages": messages}
+
 # Build graph
 builder = StateGraph(MessagesState)
 builder.add_node("assistant", assistant)
-builder.add_node("tools", ToolNode(tools))
-builder.add_edge(START, "assistant")
+builder.add_node("arithmetic", solve_arithmetic)
+# Independent tool calls from one turn run concurrently, results in tool_call order
+builder.add_node("tools", ParallelToolNode(tools, max_parallelism=8, timeout=30))
+builder.add_conditional_edges(START, route_input)
 builder.add_conditional_edges(
     "assistant",
     # If the latest message (result) from assistant is a tool call -> tools_condition routes to tools
@@ -56,6 +97,7 @@ builder.add_conditional_edges(
     tools_condition,
 )
 builder.add_edge("tools", "assistant")
+builder.add_conditional_edges("arithmetic", tools_condition)
 
 # Compile graph
 graph = builder.compile()
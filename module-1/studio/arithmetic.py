@@ -0,0 +1,112 @@
+""" Answer plain arithmetic without a model call.
+
+solve(text, tools) recognizes inputs such as "3*4+2" or "What is (10 - 4) / 3?" with a whitelist
+parser over Python's ast, evaluates them with the agent's own add/multiply/divide functions, and
+returns the messages the agent loop would have produced: an AIMessage with tool calls for each
+round of independent operations, their ToolMessages, and a final AIMessage with the answer.
+Anything else returns None and goes to the model.
+"""
+import ast
+import re
+import uuid
+from typing import Callable, Dict, List, Optional, Union
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+# Keeps the fast path to small inputs; longer ones go to the model
+MAX_OPERATIONS = 16
+MAX_DIGITS = 15
+
+_prefix = re.compile(r"^\s*(what\s+is|what's|calculate|compute|evaluate)\s+", re.IGNORECASE)
+_suffix = re.compile(r"[\s?=.!]*$")
+# Dates and phone numbers such as 2024-10-19, 10/19/2024 or 555-123-4567 look like arithmetic but aren't
+_date_or_phone = re.compile(r"\d+([-/])\d+\1\d+")
+
+Number = Union[int, float]
+
+class _Op:
+    """ One binary operation in the expression tree, i.e. one tool call """
+
+    def __init__(self, tool: str, left: Union["_Op", int], right: Union["_Op", int]):
+        self.tool, self.left, self.right = tool, left, right
+        self.value: Optional[Number] = None
+        # Rounds needed before this call can be made: a call waits for the calls producing its operands
+        self.round = 1 + max(operand.round if isinstance(operand, _Op) else 0 for operand in (left, right))
+
+def _build(node: ast.AST, ops: List[_Op]) -> Union[_Op, int]:
+    if isinstance(node, ast.Constant) and type(node.value) is int and len(str(node.value)) <= MAX_DIGITS:
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand = _build(node.operand, ops)
+        if isinstance(operand, _Op):
+            # -(a * b) becomes multiply(a * b, -1), as there is no negate tool
+            op = _Op("multiply", operand, -1 if isinstance(node.op, ast.USub) else 1)
+            ops.append(op)
+            return op
+        return -operand if isinstance(node.op, ast.USub) else operand
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub, ast.Mult, ast.Div)):
+        left, right = _build(node.left, ops), _build(node.right, ops)
+        if isinstance(node.op, ast.Sub):
+            # a - b is add(a, -b); only literal b can be negated without another call
+            if isinstance(right, _Op):
+                right = _Op("multiply", right, -1)
+                ops.append(right)
+            else:
+                right = -right
+            op = _Op("add", left, right)
+        else:
+            op = _Op({ast.Add: "add", ast.Mult: "multiply", ast.Div: "divide"}[type(node.op)], left, right)
+        ops.append(op)
+        return op
+    raise ValueError("not plain arithmetic")
+
+def parse(text: str) -> Optional[List[_Op]]:
+    """ The tool calls for text, in evaluation order, or None if text is not plain arithmetic """
+    expression = _suffix.sub("", _prefix.sub("", text)).replace("×", "*").replace("÷", "/")
+    if not expression or not re.fullmatch(r"[\d\s+\-*/().]+", expression) or _date_or_phone.search(expression):
+        return None
+    try:
+        ops: List[_Op] = []
+        root = _build(ast.parse(expression, mode="eval").body, ops)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+    # A bare number is not a calculation worth skipping the model for
+    if not isinstance(root, _Op) or len(ops) > MAX_OPERATIONS:
+        return None
+    return ops
+
+def _value(operand: Union[_Op, int]) -> Number:
+    value = operand.value if isinstance(operand, _Op) else operand
+    # Tools take ints; a fractional intermediate result can't be passed on without changing their contract
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError("fractional operand")
+        return int(value)
+    return value
+
+def _format(value: Number) -> str:
+    return str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+
+def solve(text: str, tools: Dict[str, Callable]) -> Optional[List[BaseMessage]]:
+    """ Messages answering text with tools, or None if the model should handle it """
+    ops = parse(text)
+    if ops is None:
+        return None
+    messages: List[BaseMessage] = []
+    try:
+        for round_ in range(1, max(op.round for op in ops) + 1):
+            batch = [op for op in ops if op.round == round_]
+            calls = [{"name": op.tool, "args": {"a": _value(op.left), "b": _value(op.right)},
+                      "id": f"call_{uuid.uuid4().hex[:24]}", "type": "tool_call"} for op in batch]
+            results = []
+            for op, call in zip(batch, calls):
+                op.value = tools[op.tool](**call["args"])
+                results.append(ToolMessage(content=_format(op.value), name=op.tool, tool_call_id=call["id"]))
+            messages.append(AIMessage(content="", tool_calls=calls))
+            messages.extend(results)
+    except (ValueError, ZeroDivisionError, OverflowError):
+        # Let the model explain division by zero and the like
+        return None
+    answer = ops[-1].value
+    messages.append(AIMessage(content=f"{_suffix.sub('', _prefix.sub('', text)).strip()} = {_format(answer)}"))
+    return messages
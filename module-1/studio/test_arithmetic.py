@@ -0,0 +1,13 @@
+import pytest
+
+from arithmetic import solve
+
+TOOLS = {"add": lambda a, b: a + b, "multiply": lambda a, b: a * b, "divide": lambda a, b: a / b}
+
+@pytest.mark.parametrize("text", ["2024-10-19", "10/19/2024", "555-123-4567", "What is 2024-10-19?"])
+def test_dates_and_phone_numbers_go_to_the_model(text):
+    assert solve(text, TOOLS) is None
+
+@pytest.mark.parametrize("text, answer", [("3*4+2", "14"), ("What is (10 - 4) / 3?", "2"), ("10 - 4 - 3", "3")])
+def test_arithmetic_is_answered(text, answer):
+    assert solve(text, TOOLS)[-1].content.endswith(f"= {answer}")
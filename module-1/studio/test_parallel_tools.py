@@ -0,0 +1,29 @@
+import time
+
+from langchain_core.messages import AIMessage
+
+from parallel_tools import ParallelToolNode
+
+def nap(seconds: float) -> str:
+    """ Sleep for seconds """
+    time.sleep(seconds)
+    return "done"
+
+def step(*durations: float) -> dict:
+    calls = [{"name": "nap", "args": {"seconds": d}, "id": f"call_{i}", "type": "tool_call"} for i, d in enumerate(durations)]
+    return {"messages": [AIMessage(content="", tool_calls=calls)]}
+
+def test_timeout_counts_from_call_start_not_step_start():
+    # With one call at a time the third call starts at 0.4s, after a 0.3s step-level deadline would have passed
+    node = ParallelToolNode([nap], max_parallelism=1, timeout=0.3)
+    results = node(step(0.2, 0.2, 0.2), {})["messages"]
+    assert [m.content for m in results] == ["done"] * 3
+
+def test_timed_out_call_frees_its_slot():
+    node = ParallelToolNode([nap], max_parallelism=1, timeout=0.2)
+    started = time.monotonic()
+    results = node(step(2.0, 0.05), {})["messages"]
+    assert results[0].status == "error" and "timed out" in results[0].content
+    assert results[1].content == "done"
+    assert [m.tool_call_id for m in results] == ["call_0", "call_1"]
+    assert time.monotonic() - started < 1.0
@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from chatbot import needs_summary, summarize_conversation
+
+class BackgroundSummarizer:
+    """Summarize chatbot threads off the critical path of a turn.
+
+    Use it with a chatbot graph compiled with a checkpointer and invoked with
+    summarize_in_background set, so each turn ends right after call_model:
+
+        summarizer = BackgroundSummarizer(graph)
+        summarizer.wait(config, timeout=0.5)   # before the turn
+        graph.invoke({"messages": [...]}, config)
+        summarizer.schedule(config)            # after the reply is returned
+
+    The summary is written to the thread only if the thread has not moved on
+    since the snapshot it was computed from. If wait() times out, the next turn
+    runs on the unsummarized history and the late summary is discarded.
+    """
+
+    def __init__(self, graph, max_workers: int = 4):
+        self.graph = graph
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._pending: dict[str, tuple[Future, dict]] = {}
+
+    def schedule(self, config: RunnableConfig) -> Optional[Future]:
+        """Start summarizing the thread in the background if it is over budget."""
+        snapshot = self.graph.get_state(config)
+        if not needs_summary(snapshot.values, config):
+            return None
+        job = {"abandoned": False}
+        future = self._executor.submit(self._summarize, config, snapshot, job)
+        with self._lock:
+            self._pending[config["configurable"]["thread_id"]] = (future, job)
+        return future
+
+    def _summarize(self, config: RunnableConfig, snapshot, job: dict) -> bool:
+        update = summarize_conversation(snapshot.values)
+        with self._lock:
+            if job["abandoned"]:
+                return False
+            # Version check: only apply the summary on top of the checkpoint it was computed from
+            latest = self.graph.get_state(config)
+            if latest.config["configurable"]["checkpoint_id"] != snapshot.config["configurable"]["checkpoint_id"]:
+                return False
+            self.graph.update_state(config, update, as_node="summarize_conversation")
+            return True
+
+    def wait(self, config: RunnableConfig, timeout: Optional[float] = None) -> bool:
+        """Wait for the thread's pending summary before the next turn reads state.
+
+        Returns True if there was nothing pending or the summary was applied,
+        and False if the turn should go ahead on the unsummarized history
+        because the summary timed out, failed or was computed from a stale snapshot.
+        """
+        with self._lock:
+            entry = self._pending.pop(config["configurable"]["thread_id"], None)
+        if entry is None:
+            return True
+        future, job = entry
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            with self._lock:
+                if not future.done():
+                    job["abandoned"] = True
+                    return False
+        except Exception:
+            # A failed summary call must not fail the turn
+            return False
+        # It finished between the timeout and taking the lock
+        try:
+            return future.result()
+        except Exception:
+            return False
@@ -0,0 +1,96 @@
+""" Benchmark SqliteSaver against FastSqliteSaver under concurrent threads.
+
+Usage: python bench_checkpointer.py [--threads 1 16 64] [--turns 50] [--db /tmp/bench_checkpoints.db]
+
+Each thread runs its own conversation on a small message graph with an echo node in place of the
+model, so the time measured is checkpointing. After every turn the thread reads its state back with
+get_state. Reports committed checkpoint and write rows per second and p50/p99 get_state latency.
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from fast_sqlite import FastSqliteSaver
+
+def echo(state: MessagesState):
+    return {"messages": [AIMessage(content=f"echo: {state['messages'][-1].content}")]}
+
+builder = StateGraph(MessagesState)
+builder.add_node("conversation", echo)
+builder.add_edge(START, "conversation")
+builder.add_edge("conversation", END)
+
+@contextmanager
+def sqlite_saver(path: str):
+    # As in chatbot-external-memory.ipynb
+    conn = sqlite3.connect(path, check_same_thread=False)
+    try:
+        yield SqliteSaver(conn)
+    finally:
+        conn.close()
+
+def count_rows(path: str) -> int:
+    with sqlite3.connect(path) as conn:
+        return sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("checkpoints", "writes"))
+
+def remove_db(path: str) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def run(saver_factory, path: str, num_threads: int, turns: int) -> dict:
+    remove_db(path)
+    latencies = [[] for _ in range(num_threads)]
+    with saver_factory(path) as saver:
+        graph = builder.compile(checkpointer=saver)
+
+        def conversation(thread: int):
+            config = {"configurable": {"thread_id": f"thread-{thread}"}}
+            for turn in range(turns):
+                graph.invoke({"messages": [HumanMessage(content=f"turn {turn}")]}, config)
+                start = time.perf_counter()
+                graph.get_state(config)
+                latencies[thread].append(time.perf_counter() - start)
+
+        workers = [threading.Thread(target=conversation, args=(i,)) for i in range(num_threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+    rows = count_rows(path)
+    remove_db(path)
+    all_latencies = np.concatenate([np.array(thread_latencies) for thread_latencies in latencies]) * 1e3
+    return {
+        "writes_per_s": rows / elapsed,
+        "p50_ms": float(np.percentile(all_latencies, 50)),
+        "p99_ms": float(np.percentile(all_latencies, 99)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--db", default="/tmp/bench_checkpoints.db")
+    args = parser.parse_args()
+
+    savers = {"SqliteSaver": sqlite_saver, "FastSqliteSaver": FastSqliteSaver.from_conn_string}
+
+    print(f"{'threads':>7}  {'saver':<16}  {'writes/s':>9}  {'get_state p50 ms':>16}  {'get_state p99 ms':>16}")
+    for num_threads in args.threads:
+        for name, factory in savers.items():
+            result = run(factory, args.db, num_threads, args.turns)
+            print(f"{num_threads:>7}  {name:<16}  {result['writes_per_s']:>9.0f}  {result['p50_ms']:>16.2f}  {result['p99_ms']:>16.2f}")
+
+if __name__ == "__main__":
+    main()
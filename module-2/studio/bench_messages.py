@@ -0,0 +1,72 @@
+""" Benchmark add_messages against add_indexed_messages on long histories.
+
+Usage: python bench_messages.py [--sizes 100 1000 10000] [--repeat 20]
+
+Histories are user / AI-with-tool-call / tool-result triples. For each size, times:
+* append: one new message merged into the history, as every node update does;
+* summarize: removing all but the last 2 messages, as summarize_conversation does;
+* dangling check: finding AI tool calls without a result, as the module-3 tweak agents do
+  before each model call, using their linear scan vs the indexes.
+"""
+import argparse
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langgraph.graph.message import add_messages
+
+from indexed_messages import IndexedMessages, add_indexed_messages
+
+def make_history(size: int) -> list:
+    messages = []
+    for i in range(size // 3 + 1):
+        call_id = f"call-{i}"
+        messages += [
+            HumanMessage(content=f"question {i}", id=f"human-{i}"),
+            AIMessage(content="", id=f"ai-{i}", tool_calls=[{"name": "add", "args": {"a": i, "b": 1}, "id": call_id}]),
+            ToolMessage(content=str(i + 1), id=f"tool-{i}", tool_call_id=call_id),
+        ]
+    return messages[:size]
+
+def scan_dangling(messages: list) -> list:
+    """ The pruning loop from my_tweaks/m3_l3_editing_state_tweak.py """
+    cleaned = []
+    for i, msg in enumerate(messages):
+        cleaned.append(msg)
+        if msg.type == "ai" and msg.tool_calls:
+            if not (i + 1 < len(messages) and messages[i + 1].type == "tool"):
+                cleaned.pop()
+    return cleaned
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'messages':>8}  {'operation':<15}  {'add_messages ms':>15}  {'indexed ms':>10}  {'speedup':>7}")
+    for size in args.sizes:
+        history = make_history(size)
+        indexed = IndexedMessages(history)
+        new_message = [HumanMessage(content="one more", id="new")]
+        removals = [RemoveMessage(id=m.id) for m in history[:-2]]
+
+        cases = {
+            "append": (lambda: add_messages(history, new_message),
+                       lambda: add_indexed_messages(indexed, new_message)),
+            "summarize": (lambda: add_messages(history, removals),
+                          lambda: add_indexed_messages(indexed, removals)),
+            "dangling check": (lambda: scan_dangling(history),
+                               lambda: indexed.without_dangling_tool_calls()),
+        }
+        for name, (baseline, candidate) in cases.items():
+            before, after = timed(baseline, args.repeat), timed(candidate, args.repeat)
+            print(f"{size:>8}  {name:<15}  {before:>15.3f}  {after:>10.3f}  {before / after:>6.0f}x")
+
+if __name__ == "__main__":
+    main()
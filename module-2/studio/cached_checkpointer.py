@@ -0,0 +1,256 @@
+""" Read-through cache of each thread's latest checkpoint, in front of any checkpointer.
+
+Every turn starts with get_tuple for the thread's latest checkpoint, which for an active
+conversation is the checkpoint this process wrote at the end of the previous turn.
+CachedCheckpointSaver keeps that checkpoint in a size-bounded LRU, filled on put (write-through)
+and on misses, so the next turn skips the backend read and deserialization.
+
+When several workers share a backend, pass a version_probe: a cheap query returning the version
+of the thread's latest checkpoint (its id and number of pending writes). A cached entry is only
+served while the probe matches it. Without a probe the cache assumes this process is the only
+writer. The async methods share the same cache and run the probe in a worker thread.
+
+    saver = FastSqliteSaver("state_db/example.db")
+    memory = CachedCheckpointSaver(saver, version_probe=sqlite_version_probe(saver))
+"""
+import asyncio
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Hashable, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    copy_checkpoint,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+VersionProbe = Callable[[RunnableConfig], Optional[Hashable]]
+
+def sqlite_version_probe(saver) -> VersionProbe:
+    """ Version probe for SqliteSaver and FastSqliteSaver: latest checkpoint id and its pending write count """
+
+    def probe(config: RunnableConfig) -> Optional[Hashable]:
+        with saver.cursor(transaction=False) as cur:
+            cur.execute(
+                "SELECT c.checkpoint_id, (SELECT COUNT(*) FROM writes w WHERE w.thread_id = c.thread_id "
+                "AND w.checkpoint_ns = c.checkpoint_ns AND w.checkpoint_id = c.checkpoint_id) "
+                "FROM checkpoints c WHERE c.thread_id = ? AND c.checkpoint_ns = ? ORDER BY c.checkpoint_id DESC LIMIT 1",
+                (str(config["configurable"]["thread_id"]), config["configurable"].get("checkpoint_ns", "")),
+            )
+            return cur.fetchone()
+
+    return probe
+
+def approx_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """ Rough in-memory size of a checkpoint: containers, strings and pydantic models such as messages """
+    _seen = set() if _seen is None else _seen
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, _seen) + approx_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(item, _seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += approx_size(vars(obj), _seen)
+    return size
+
+def _thread_key(config: RunnableConfig) -> Tuple[str, str]:
+    return str(config["configurable"]["thread_id"]), config["configurable"].get("checkpoint_ns", "")
+
+class CachedCheckpointSaver(BaseCheckpointSaver):
+    """ Wraps a checkpointer with an LRU of the latest checkpoint per thread.
+
+    The cache holds at most max_threads entries and about max_bytes of checkpoint data. stats()
+    reports hits, misses, stale entries caught by the version probe, evictions and memory use.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, version_probe: Optional[VersionProbe] = None,
+                 max_threads: int = 1024, max_bytes: int = 256 * 2**20):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.version_probe = version_probe
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        # (thread_id, checkpoint_ns) -> (version, checkpoint tuple, size)
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[Hashable, CheckpointTuple, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    # Cache bookkeeping
+
+    def _store(self, key: Tuple[str, str], version: Hashable, saved: CheckpointTuple) -> None:
+        size = approx_size(saved.checkpoint) + approx_size(saved.pending_writes)
+        with self._lock:
+            self._drop(key)
+            if size > self.max_bytes:
+                return
+            self._cache[key] = (version, saved, size)
+            self._bytes += size
+            while len(self._cache) > self.max_threads or self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._cache.popitem(last=False)
+                self._bytes -= evicted
+                self._stats["evictions"] += 1
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        entry = self._cache.pop(key, None)
+        if entry:
+            self._bytes -= entry[2]
+
+    def _version(self, saved: CheckpointTuple) -> Hashable:
+        # Same shape as sqlite_version_probe returns
+        return (saved.config["configurable"]["checkpoint_id"], len(saved.pending_writes or []))
+
+    def _cached(self, config: RunnableConfig) -> Optional[Tuple[Hashable, CheckpointTuple, int]]:
+        """ The cached entry that can answer this read, if any, before the version probe """
+        key = _thread_key(config)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry:
+                self._cache.move_to_end(key)
+        if entry and get_checkpoint_id(config) in (None, entry[1].config["configurable"]["checkpoint_id"]):
+            return entry
+        return None
+
+    def _hit(self, entry: Tuple[Hashable, CheckpointTuple, int], current: Optional[Hashable]) -> Optional[CheckpointTuple]:
+        version, saved, _ = entry
+        if self.version_probe is None or current == version:
+            with self._lock:
+                self._stats["hits"] += 1
+            # The loop mutates the checkpoint it loads, so hand out a copy
+            return saved._replace(checkpoint=copy_checkpoint(saved.checkpoint))
+        with self._lock:
+            self._stats["stale"] += 1
+        return None
+
+    def _miss(self, config: RunnableConfig, saved: Optional[CheckpointTuple]) -> Optional[CheckpointTuple]:
+        with self._lock:
+            self._stats["misses"] += 1
+        if saved is not None and get_checkpoint_id(config) is None:
+            self._store(_thread_key(config), self._version(saved), saved._replace(checkpoint=copy_checkpoint(saved.checkpoint)))
+        return saved
+
+    def _written(self, config: RunnableConfig, next_config: RunnableConfig, checkpoint: Checkpoint,
+                 metadata: CheckpointMetadata) -> None:
+        # The tuple a read of next_config would return, built from what was just written
+        parent_config = (
+            {"configurable": {**next_config["configurable"], "checkpoint_id": config["configurable"]["checkpoint_id"]}}
+            if config["configurable"].get("checkpoint_id") else None
+        )
+        saved = CheckpointTuple(next_config, copy_checkpoint(checkpoint),
+                                get_checkpoint_metadata(config, metadata), parent_config, [])
+        self._store(_thread_key(next_config), self._version(saved), saved)
+
+    def _drop_threads(self, thread_ids: Optional[Sequence[str]] = None) -> None:
+        """ Forget every namespace of the given threads, or the whole cache """
+        with self._lock:
+            if thread_ids is None:
+                keys = list(self._cache)
+            else:
+                thread_ids = {str(thread_id) for thread_id in thread_ids}
+                keys = [key for key in self._cache if key[0] in thread_ids]
+            for key in keys:
+                self._drop(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {**self._stats, "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                    "threads": len(self._cache), "bytes": self._bytes}
+
+    # Checkpointer interface
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        entry = self._cached(config)
+        if entry:
+            saved = self._hit(entry, self.version_probe(config) if self.version_probe else None)
+            if saved is not None:
+                return saved
+        return self._miss(config, self.saver.get_tuple(config))
+
+    def list(self, config: Optional[RunnableConfig], **kwargs: Any) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, **kwargs)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        next_config = self.saver.put(config, checkpoint, metadata, new_versions)
+        self._written(config, next_config, checkpoint, metadata)
+        return next_config
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        self.saver.put_writes(config, writes, task_id, task_path)
+        # Pending writes change the latest checkpoint's tuple; reload it on the next read
+        with self._lock:
+            self._drop(_thread_key(config))
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.saver.delete_thread(thread_id)
+        self._drop_threads([thread_id])
+
+    def delete_for_runs(self, run_ids: Sequence[str]) -> None:
+        self.saver.delete_for_runs(run_ids)
+        # Runs don't map to threads without a backend query, so start over
+        self._drop_threads()
+
+    def copy_thread(self, source_thread_id: str, target_thread_id: str) -> None:
+        self.saver.copy_thread(source_thread_id, target_thread_id)
+        self._drop_threads([target_thread_id])
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        self.saver.prune(thread_ids, strategy=strategy)
+        self._drop_threads(thread_ids)
+
+    def get_next_version(self, current: Optional[Any], channel: None) -> Any:
+        return self.saver.get_next_version(current, channel)
+
+    # Async methods use the same cache; the version probe is a blocking query, so it runs in a thread
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        entry = self._cached(config)
+        if entry:
+            saved = self._hit(entry, await asyncio.to_thread(self.version_probe, config) if self.version_probe else None)
+            if saved is not None:
+                return saved
+        return self._miss(config, await self.saver.aget_tuple(config))
+
+    async def alist(self, config: Optional[RunnableConfig], **kwargs: Any) -> AsyncIterator[CheckpointTuple]:
+        async for saved in self.saver.alist(config, **kwargs):
+            yield saved
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        next_config = await self.saver.aput(config, checkpoint, metadata, new_versions)
+        self._written(config, next_config, checkpoint, metadata)
+        return next_config
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await self.saver.aput_writes(config, writes, task_id, task_path)
+        with self._lock:
+            self._drop(_thread_key(config))
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.saver.adelete_thread(thread_id)
+        self._drop_threads([thread_id])
+
+    async def adelete_for_runs(self, run_ids: Sequence[str]) -> None:
+        await self.saver.adelete_for_runs(run_ids)
+        self._drop_threads()
+
+    async def acopy_thread(self, source_thread_id: str, target_thread_id: str) -> None:
+        await self.saver.acopy_thread(source_thread_id, target_thread_id)
+        self._drop_threads([target_thread_id])
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        await self.saver.aprune(thread_ids, strategy=strategy)
+        self._drop_threads(thread_ids)
@@ -1,22 +1,73 @@
-from typing import Literal
+from typing import Annotated, Literal, Optional
 from langchain_core.messages import HumanMessage, SystemMessage, RemoveMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import MessagesState
 from langgraph.graph import StateGraph, START, END
 
+import configuration
+from indexed_messages import IndexedMessages, add_indexed_messages
+
 # We will use this model for both the conversation and the summarization
 from langchain_openai import ChatOpenAI
 model = ChatOpenAI(model="gpt-4o", temperature=0) 
 
+def update_token_counts(left: dict, right: dict) -> dict:
+    """Merge per-message token counts; a count of None drops that message."""
+    merged = dict(left or {})
+    for message_id, count in (right or {}).items():
+        if count is None:
+            merged.pop(message_id, None)
+        else:
+            merged[message_id] = count
+    return merged
+
 # State class to store messages and summary
 class State(MessagesState):
+    messages: Annotated[IndexedMessages, add_indexed_messages] # indexed by id, so removing old messages is one pass
     summary: str
+    summarized_through: str # id of the last message already folded into the summary
+    token_counts: Annotated[dict, update_token_counts] # token count per message id, computed once
+    context_tokens: int # running total of token_counts for the messages in state
+
+def count_new_tokens(messages: list, token_counts: dict) -> dict:
+    """Count tokens only for messages that are not cached yet, walking back from the newest."""
+    new_counts = {}
+    for message in reversed(messages):
+        if message.id in token_counts:
+            break
+        new_counts[message.id] = count_tokens_approximately([message])
+    return new_counts
+
+def fit_to_budget(messages: list, token_counts: dict, budget: int) -> list:
+    """Return the newest messages whose cached token counts fit in budget, keeping at least the last one."""
+    total = 0
+    start = len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        total += token_counts.get(messages[i].id, 0)
+        if total > budget and start < len(messages):
+            break
+        start = i
+    return messages[start:]
+
+def unsummarized(messages: list, summarized_through: Optional[str]) -> list:
+    """Return the messages that come after the summary watermark."""
+    return IndexedMessages.of(messages).after(summarized_through)
     
 # Define the logic to call the model
-def call_model(state: State):
+def call_model(state: State, config: RunnableConfig):
     
     # Get summary if it exists
     summary = state.get("summary", "")
 
+    # Count tokens for the messages added since the last turn and trim the history to the budget
+    configurable = configuration.Configuration.from_runnable_config(config)
+    token_counts = state.get("token_counts") or {}
+    new_counts = count_new_tokens(state["messages"], token_counts)
+    history = state["messages"]
+    if configurable.context_token_budget:
+        history = fit_to_budget(history, {**token_counts, **new_counts}, configurable.context_token_budget)
+
     # If there is summary, then we add it to messages
     if summary:
         
@@ -24,28 +75,46 @@ def call_model(state: State):
         system_message = f"Summary of conversation earlier: {summary}"
 
         # Append summary to any newer messages
-        messages = [SystemMessage(content=system_message)] + state["messages"]
+        messages = [SystemMessage(content=system_message)] + history
     
     else:
-        messages = state["messages"]
+        messages = history
     
     response = model.invoke(messages)
-    return {"messages": response}
+
+    # A reply without an id yet gets counted on the next turn, once add_messages has assigned one
+    if response.id:
+        new_counts[response.id] = count_tokens_approximately([response])
+    context_tokens = state.get("context_tokens", 0) + sum(new_counts.values())
+    return {"messages": response, "token_counts": new_counts, "context_tokens": context_tokens}
 
 # Determine whether to end or summarize the conversation
-def should_continue(state: State) -> Literal["summarize_conversation", "__end__"]:
+def needs_summary(state: State, config: RunnableConfig) -> bool:
+    """Whether the history is over the token budget."""
+    configurable = configuration.Configuration.from_runnable_config(config)
+    return state.get("context_tokens", 0) > configurable.summary_token_budget
+
+def should_continue(state: State, config: RunnableConfig) -> Literal["summarize_conversation", "__end__"]:
     
     """Return the next node to execute."""
     
-    messages = state["messages"]
+    configurable = configuration.Configuration.from_runnable_config(config)
+    
+    # In background mode the reply returns right away and a follow-up run summarizes
+    if configurable.summarize_in_background:
+        return END
     
-    # If there are more than six messages, then we summarize the conversation
-    if len(messages) > 6:
+    # If the history is over the token budget, then we summarize the conversation
+    if needs_summary(state, config):
         return "summarize_conversation"
     
     # Otherwise we can just end
     return END
 
+def route_summary(state: State, config: RunnableConfig) -> Literal["summarize_conversation", "__end__"]:
+    """Entry router for the background summarizer graph."""
+    return "summarize_conversation" if needs_summary(state, config) else END
+
 def summarize_conversation(state: State):
     
     # First get the summary if it exists
@@ -64,16 +133,21 @@ def summarize_conversation(state: State):
         # If no summary exists, just create a new one
         summary_message = "Create a summary of the conversation above:"
 
-    # Add prompt to our history
-    messages = state["messages"] + [HumanMessage(content=summary_message)]
+    # Only send messages that are not in the summary yet, so each summary call costs the same
+    new_messages = unsummarized(state["messages"], state.get("summarized_through"))
+    messages = new_messages + [HumanMessage(content=summary_message)]
     response = model.invoke(messages)
     
-    # Delete all but the 2 most recent messages and add our summary to the state 
-    delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]]
-    return {"summary": response.content, "messages": delete_messages}
+    # Delete all but the 2 most recent messages, add our summary to the state and move the watermark
+    removed = state["messages"][:-2]
+    delete_messages = [RemoveMessage(id=m.id) for m in removed]
+    token_counts = state.get("token_counts") or {}
+    context_tokens = state.get("context_tokens", 0) - sum(token_counts.get(m.id, 0) for m in removed)
+    return {"summary": response.content, "messages": delete_messages, "summarized_through": state["messages"][-1].id,
+            "token_counts": {m.id: None for m in removed}, "context_tokens": context_tokens}
 
 # Define a new graph
-workflow = StateGraph(State)
+workflow = StateGraph(State, config_schema=configuration.Configuration)
 workflow.add_node("conversation", call_model)
 workflow.add_node(summarize_conversation)
 
@@ -83,4 +157,14 @@ workflow.add_conditional_edges("conversation", should_continue)
 workflow.add_edge("summarize_conversation", END)
 
 # Compile
-graph = workflow.compile()
\ No newline at end of file
+graph = workflow.compile()
+
+# Summarizer run on the same thread after a reply when summarize_in_background is set.
+# Run it with input {}: None on a finished thread has nothing to resume, so the run does nothing.
+# On LangGraph Server, create it with multitask_strategy="enqueue" so it finishes before the next turn reads state:
+#   client.runs.create(thread_id, "chatbot_summarizer", input={}, multitask_strategy="enqueue")
+summarizer_workflow = StateGraph(State, config_schema=configuration.Configuration)
+summarizer_workflow.add_node(summarize_conversation)
+summarizer_workflow.add_conditional_edges(START, route_summary)
+summarizer_workflow.add_edge("summarize_conversation", END)
+summarizer = summarizer_workflow.compile()
\ No newline at end of file
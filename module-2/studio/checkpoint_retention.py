@@ -0,0 +1,227 @@
+""" Retention and compaction for SqliteSaver checkpoint databases.
+
+Usage: python checkpoint_retention.py ../state_db/example.db [--keep-last 20] [--turns-only]
+                                      [--max-age-days 30] [--batch-size 500] [--dry-run]
+
+SqliteSaver keeps a checkpoint for every superstep of every thread. This applies retention policies
+and deletes what they drop, along with its pending writes:
+
+* --max-age-days drops whole threads whose latest checkpoint is older than that. Checkpoint ids
+  are UUIDv6, so the age comes from the id itself;
+* --turns-only keeps only turn boundaries: the last checkpoint of each invoke, i.e. the parent of
+  every "input" checkpoint, plus the thread's latest checkpoint;
+* --keep-last keeps at most the N most recent checkpoints (after --turns-only) per thread.
+
+Kept checkpoints are re-linked to their nearest kept ancestor, so get_state_history still walks a
+connected chain. Deletes run in small transactions so the graph can keep writing while it runs.
+If the database also holds MessageStoreSerializer's message table, messages no kept checkpoint
+refers to are deleted too. Then free pages are returned to the OS a batch at a time with
+incremental vacuum.
+"""
+import argparse
+import os
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from message_store import MessageStore
+
+# 100 ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+def checkpoint_time(checkpoint_id: str) -> float:
+    """ Unix timestamp embedded in a UUIDv6 checkpoint id """
+    digits = checkpoint_id.replace("-", "")
+    # v6 stores the 60-bit timestamp most significant bits first, around the 4-bit version
+    ticks = (int(digits[0:8], 16) << 28) | (int(digits[8:12], 16) << 12) | int(digits[13:16], 16)
+    return (ticks - UUID_EPOCH_OFFSET) / 1e7
+
+@dataclass
+class RetentionPolicy:
+    keep_last: Optional[int] = None
+    turns_only: bool = False
+    max_age_seconds: Optional[float] = None
+
+@dataclass
+class RetentionReport:
+    threads_scanned: int = 0
+    threads_dropped: int = 0
+    checkpoints_deleted: int = 0
+    writes_deleted: int = 0
+    messages_deleted: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    # Pages freed inside the file that incremental vacuum could not return, e.g. auto_vacuum is off
+    bytes_free_in_file: int = 0
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+# One row per checkpoint: (checkpoint_id, parent_checkpoint_id, source)
+Row = Tuple[str, Optional[str], Optional[str]]
+
+def select_kept(rows: List[Row], policy: RetentionPolicy) -> List[str]:
+    """ Ids to keep from one thread's checkpoints, ordered oldest first """
+    ids = [checkpoint_id for checkpoint_id, _, _ in rows]
+    if not ids:
+        return []
+    if policy.turns_only:
+        # An "input" checkpoint starts a turn, so its parent ended the previous one
+        boundaries = {parent for _, parent, source in rows if source == "input" and parent}
+        boundaries.add(ids[-1])
+        ids = [checkpoint_id for checkpoint_id in ids if checkpoint_id in boundaries]
+    if policy.keep_last is not None:
+        ids = ids[-policy.keep_last:] if policy.keep_last > 0 else []
+    return ids
+
+def relink(rows: List[Row], kept: set) -> Dict[str, Optional[str]]:
+    """ New parent for each kept checkpoint whose parent is being deleted """
+    parents = {checkpoint_id: parent for checkpoint_id, parent, _ in rows}
+    changes = {}
+    for checkpoint_id in kept:
+        parent = parents.get(checkpoint_id)
+        ancestor = parent
+        while ancestor is not None and ancestor not in kept:
+            ancestor = parents.get(ancestor)
+        if ancestor != parent:
+            changes[checkpoint_id] = ancestor
+    return changes
+
+def database_bytes(path: str) -> int:
+    return sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+
+def batches(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def delete_checkpoints(conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str, ids: List[str],
+                       batch_size: int, pause: float) -> Tuple[int, int]:
+    deleted = writes = 0
+    for batch in batches(ids, batch_size):
+        marks = ",".join("?" * len(batch))
+        with conn:
+            deleted += conn.execute(
+                f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({marks})",
+                (thread_id, checkpoint_ns, *batch),
+            ).rowcount
+            writes += conn.execute(
+                f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({marks})",
+                (thread_id, checkpoint_ns, *batch),
+            ).rowcount
+        # Leave a gap between transactions so the graph's own writes get the lock
+        time.sleep(pause)
+    return deleted, writes
+
+def incremental_vacuum(conn: sqlite3.Connection, pages_per_step: int, pause: float) -> None:
+    """ Return free pages to the OS a few at a time; a no-op unless auto_vacuum is INCREMENTAL """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return
+    while conn.execute("PRAGMA freelist_count").fetchone()[0]:
+        conn.execute(f"PRAGMA incremental_vacuum({pages_per_step})").fetchall()
+        time.sleep(pause)
+
+def apply_retention(
+    path: str,
+    policy: RetentionPolicy,
+    batch_size: int = 500,
+    pause: float = 0.01,
+    vacuum_pages: int = 256,
+    dry_run: bool = False,
+) -> RetentionReport:
+    """ Apply policy to the checkpoint database at path, returning what was deleted and reclaimed """
+    report = RetentionReport(bytes_before=database_bytes(path))
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        threads = conn.execute("SELECT DISTINCT thread_id FROM checkpoints").fetchall()
+        now = time.time()
+        for (thread_id,) in threads:
+            report.threads_scanned += 1
+            namespaces = conn.execute(
+                "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?", (thread_id,)
+            ).fetchall()
+            latest = conn.execute(
+                "SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ?", (thread_id,)
+            ).fetchone()[0]
+            expired = policy.max_age_seconds is not None and now - checkpoint_time(latest) > policy.max_age_seconds
+            report.threads_dropped += expired
+
+            for (checkpoint_ns,) in namespaces:
+                rows: List[Row] = conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, json_extract(CAST(metadata AS TEXT), '$.source') "
+                    "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id",
+                    (thread_id, checkpoint_ns),
+                ).fetchall()
+                kept = set() if expired else set(select_kept(rows, policy))
+                dropped = [checkpoint_id for checkpoint_id, _, _ in rows if checkpoint_id not in kept]
+                if dry_run:
+                    report.checkpoints_deleted += len(dropped)
+                    continue
+                # Re-link before deleting so a crash part way leaves every chain connected
+                with conn:
+                    conn.executemany(
+                        "UPDATE checkpoints SET parent_checkpoint_id = ? "
+                        "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                        [(parent, thread_id, checkpoint_ns, checkpoint_id)
+                         for checkpoint_id, parent in relink(rows, kept).items()],
+                    )
+                deleted, writes = delete_checkpoints(conn, thread_id, checkpoint_ns, dropped, batch_size, pause)
+                report.checkpoints_deleted += deleted
+                report.writes_deleted += writes
+
+        if not dry_run and conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages'"
+        ).fetchone():
+            store = MessageStore(path)
+            try:
+                report.messages_deleted = store.collect_garbage(conn, batch_size=batch_size)
+            finally:
+                store.close()
+        if not dry_run:
+            incremental_vacuum(conn, vacuum_pages, pause)
+            # Fold the WAL back into the database file so its space is counted too
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        report.bytes_free_in_file = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+    finally:
+        conn.close()
+    report.bytes_after = database_bytes(path)
+    return report
+
+def enable_incremental_vacuum(path: str) -> None:
+    """ One-off switch to auto_vacuum=INCREMENTAL. Rebuilds the file with VACUUM, which locks it while it runs """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db")
+    parser.add_argument("--keep-last", type=int)
+    parser.add_argument("--turns-only", action="store_true")
+    parser.add_argument("--max-age-days", type=float)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.01, help="seconds to sleep between batches")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="switch the file to auto_vacuum=INCREMENTAL first (one full VACUUM)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if args.enable_incremental_vacuum and not args.dry_run:
+        enable_incremental_vacuum(args.db)
+    policy = RetentionPolicy(
+        keep_last=args.keep_last,
+        turns_only=args.turns_only,
+        max_age_seconds=args.max_age_days * 86400 if args.max_age_days is not None else None,
+    )
+    report = apply_retention(args.db, policy, args.batch_size, args.pause, dry_run=args.dry_run)
+    for key, value in asdict(report).items():
+        print(f"{key:>20}: {value}")
+    print(f"{'bytes_reclaimed':>20}: {report.bytes_reclaimed}")
+
+if __name__ == "__main__":
+    main()
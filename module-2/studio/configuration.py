@@ -0,0 +1,38 @@
+import os
+from dataclasses import dataclass, fields
+from typing import Any, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+def _coerce(type_: type, value: Any) -> Any:
+    # bool("false") is True, so booleans are parsed from their usual spellings instead
+    if type_ is bool:
+        return value if isinstance(value, bool) else str(value).strip().lower() in {"1", "true", "yes"}
+    return type_(value)
+
+@dataclass(kw_only=True)
+class Configuration:
+    """The configurable fields for the chatbot."""
+    # Summarize once the messages in state add up to more than this many tokens
+    summary_token_budget: int = 2000
+    # Most tokens of history sent to the model per turn; 0 sends every message in state
+    context_token_budget: int = 0
+    # Return the reply without summarizing and leave summarization to a follow-up run on the thread
+    summarize_in_background: bool = False
+
+    @classmethod
+    def from_runnable_config(
+        cls, config: Optional[RunnableConfig] = None
+    ) -> "Configuration":
+        """Create a Configuration instance from a RunnableConfig."""
+        configurable = (
+            config["configurable"] if config and "configurable" in config else {}
+        )
+        values: dict[str, Any] = {
+            f.name: os.environ.get(f.name.upper(), configurable.get(f.name))
+            for f in fields(cls)
+            if f.init
+        }
+        # Environment variables arrive as strings, so coerce to the field type
+        types = {f.name: f.type for f in fields(cls)}
+        return cls(**{k: _coerce(types[k], v) for k, v in values.items() if v is not None and v != ""})
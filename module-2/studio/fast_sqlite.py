@@ -0,0 +1,184 @@
+""" SQLite checkpointer tuned for many threads sharing one database file.
+
+SqliteSaver runs every read and write through one connection behind one lock, and commits (and
+fsyncs) once per put. FastSqliteSaver keeps SqliteSaver's schema and SQL but:
+
+* puts the database in WAL mode with synchronous=NORMAL, so commits append to the log without an
+  fsync and readers never block the writer;
+* sends every write to a single writer thread, which drains whatever writes are queued and commits
+  them together (group commit). Callers still block until their write is committed, so a get_state
+  after invoke sees the new checkpoint;
+* serves reads from a pool of read-only connections, so get_state never waits on a write;
+* keeps the SQL text of every statement fixed and gives each connection a statement cache, so
+  statements are prepared once per connection and reused.
+
+    with FastSqliteSaver.from_conn_string("state_db/example.db") as memory:
+        graph = workflow.compile(checkpointer=memory)
+"""
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+# Prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 256
+
+def _connect(path: str, read_only: bool = False) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        path,
+        check_same_thread=False,
+        # The writer issues BEGIN/COMMIT itself so a group of writes shares one transaction
+        isolation_level=None,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        timeout=30,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    # In WAL mode NORMAL only syncs at checkpoints; a crash can lose the last commits but never corrupts the file
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if read_only:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+class _RecordingCursor:
+    """ Stands in for a write cursor: collects statements for the writer thread instead of running them """
+
+    def __init__(self):
+        self.statements: List[Tuple[bool, str, Any]] = []
+
+    def execute(self, sql: str, parameters: Any = ()) -> "_RecordingCursor":
+        self.statements.append((False, sql, parameters))
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> "_RecordingCursor":
+        # Rows are materialized here so serialization happens on the calling thread, not the writer
+        self.statements.append((True, sql, list(seq_of_parameters)))
+        return self
+
+class FastSqliteSaver(SqliteSaver):
+    """ SqliteSaver with WAL, a group-committing writer thread and pooled read connections.
+
+    path must be a file; ":memory:" databases can't be shared between connections.
+    """
+
+    def __init__(self, path: str, *, readers: int = 8, max_batch: int = 512,
+                 serde: Optional[SerializerProtocol] = None):
+        if path == ":memory:":
+            raise ValueError("FastSqliteSaver needs a database file; use SqliteSaver for :memory:")
+        super().__init__(_connect(path), serde=serde)
+        self.path = path
+        self.max_batch = max_batch
+        # Create the tables before any reader or the writer thread touches the file
+        with self.lock:
+            self.setup()
+
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        for _ in range(readers):
+            self._readers.put(_connect(path, read_only=True))
+
+        self._writes: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-checkpoint-writer", daemon=True)
+        self._writer.start()
+        self.group_commits = 0
+        self.writes_committed = 0
+
+    @classmethod
+    @contextmanager
+    def from_conn_string(cls, conn_string: str, **kwargs: Any) -> Iterator["FastSqliteSaver"]:
+        saver = cls(conn_string, **kwargs)
+        try:
+            yield saver
+        finally:
+            saver.close()
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[Any]:
+        if not transaction:
+            # Reads borrow a pooled connection and see the last committed state through WAL
+            conn = self._readers.get()
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+                self._readers.put(conn)
+            return
+
+        # Writes are recorded, handed to the writer thread, and the caller waits for the commit
+        recorder = _RecordingCursor()
+        yield recorder
+        if recorder.statements:
+            done: Future = Future()
+            self._writes.put((recorder.statements, done))
+            done.result()
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        # SqliteSaver.list also reads pending writes through self.conn, which belongs to the writer
+        with self.lock:
+            checkpoints = list(super().list(config, filter=filter, before=before, limit=limit))
+        yield from checkpoints
+
+    def _write_loop(self) -> None:
+        while True:
+            job = self._writes.get()
+            if job is None:
+                return
+            jobs = [job]
+            # Everything that queued up while the last commit ran goes into this one
+            while len(jobs) < self.max_batch:
+                try:
+                    job = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self._writes.put(None)
+                    break
+                jobs.append(job)
+            self._commit(jobs)
+
+    def _commit(self, jobs: List[tuple]) -> None:
+        failed = {}
+        with self.lock:
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                for i, (statements, _) in enumerate(jobs):
+                    # A savepoint per write, so one bad write fails alone instead of the whole group
+                    self.conn.execute("SAVEPOINT checkpoint_write")
+                    try:
+                        for many, sql, parameters in statements:
+                            if many:
+                                self.conn.executemany(sql, parameters)
+                            else:
+                                self.conn.execute(sql, parameters)
+                    except sqlite3.Error as e:
+                        self.conn.execute("ROLLBACK TO checkpoint_write")
+                        failed[i] = e
+                    self.conn.execute("RELEASE checkpoint_write")
+                self.conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+                for _, done in jobs:
+                    done.set_exception(e)
+                return
+        self.group_commits += 1
+        self.writes_committed += len(jobs) - len(failed)
+        for i, (_, done) in enumerate(jobs):
+            if i in failed:
+                done.set_exception(failed[i])
+            else:
+                done.set_result(None)
+
+    def close(self) -> None:
+        """ Flush queued writes, stop the writer thread and close every connection """
+        if not self._writer.is_alive():
+            return
+        self._writes.put(None)
+        self._writer.join()
+        while not self._readers.empty():
+            self._readers.get().close()
+        self.conn.close()
@@ -0,0 +1,160 @@
+""" Message list that keeps its own indexes, and a reducer to use it in place of add_messages.
+
+add_messages rebuilds an id -> position map over the whole history on every update, and code that
+looks for dangling tool calls re-scans every message per turn. IndexedMessages is a list of
+messages that also keeps:
+
+* id -> position, so lookups and replacements are O(1);
+* tool_call_id -> ToolMessage, so has_tool_result() is O(number of calls);
+* the AI messages whose tool calls have no result yet, so without_dangling_tool_calls() returns
+  straight away when there are none.
+
+    class State(TypedDict):
+        messages: Annotated[IndexedMessages, add_indexed_messages]
+
+add_indexed_messages has add_messages' semantics: messages with a known id replace the old one,
+RemoveMessage deletes by id (all removals in an update are applied in one pass) and
+REMOVE_ALL_MESSAGES clears the history.
+"""
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from langchain_core.messages import AIMessage, AnyMessage, BaseMessage, RemoveMessage, ToolMessage
+from langchain_core.messages.utils import convert_to_messages, message_chunk_to_message
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import core_schema
+
+class IndexedMessages(list):
+    """ List of messages with id, tool result and pending tool call indexes.
+
+    It is a plain list to everything that reads state, so models, routers and checkpointers take it
+    as is. Build one with IndexedMessages.of(); mutate it only through add_indexed_messages.
+    """
+
+    def __init__(self, messages: Iterable[BaseMessage] = ()):
+        super().__init__(messages)
+        self._reindex()
+
+    @classmethod
+    def of(cls, messages: Optional[Iterable[BaseMessage]]) -> "IndexedMessages":
+        """ Return messages itself if it is already indexed, e.g. after a checkpoint load gave a plain list """
+        return messages if isinstance(messages, cls) else cls(messages or ())
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        # Validates and serializes as list[AnyMessage], so graph input/output JSON schemas can be generated
+        return core_schema.no_info_after_validator_function(
+            cls.of, handler(List[AnyMessage]), serialization=core_schema.plain_serializer_function_ser_schema(list)
+        )
+
+    def _reindex(self) -> None:
+        self._positions: Dict[str, int] = {}
+        self._tool_results: Dict[str, ToolMessage] = {}
+        self._pending: Dict[str, set] = {}
+        for position, message in enumerate(self):
+            self._index(position, message)
+
+    def _index(self, position: int, message: BaseMessage) -> None:
+        self._positions[message.id] = position
+        if isinstance(message, ToolMessage):
+            self._tool_results[message.tool_call_id] = message
+            # Tool results follow their call, so the owner is normally the latest pending AI message
+            for ai_id in reversed(list(self._pending)):
+                calls = self._pending[ai_id]
+                if message.tool_call_id in calls:
+                    calls.discard(message.tool_call_id)
+                    if not calls:
+                        del self._pending[ai_id]
+                    break
+        elif isinstance(message, AIMessage) and message.tool_calls:
+            unanswered = {call["id"] for call in message.tool_calls if call["id"] not in self._tool_results}
+            if unanswered:
+                self._pending[message.id] = unanswered
+
+    def __copy__(self) -> "IndexedMessages":
+        copied = IndexedMessages.__new__(IndexedMessages)
+        list.extend(copied, self)
+        copied._positions = self._positions.copy()
+        copied._tool_results = self._tool_results.copy()
+        copied._pending = {ai_id: set(calls) for ai_id, calls in self._pending.items()}
+        return copied
+
+    copy = __copy__
+
+    def __reduce__(self):
+        # Pickle and deepcopy as a list and rebuild the indexes on the way back
+        return IndexedMessages, (list(self),)
+
+    # Lookups
+
+    def position(self, message_id: str) -> Optional[int]:
+        return self._positions.get(message_id)
+
+    def get(self, message_id: str) -> Optional[BaseMessage]:
+        position = self._positions.get(message_id)
+        return None if position is None else self[position]
+
+    def after(self, message_id: Optional[str]) -> List[BaseMessage]:
+        """ Messages after message_id, or all of them if it is None or not in the list """
+        position = self._positions.get(message_id) if message_id else None
+        return self[position + 1:] if position is not None else list(self)
+
+    def tool_result(self, tool_call_id: str) -> Optional[ToolMessage]:
+        return self._tool_results.get(tool_call_id)
+
+    def has_tool_result(self, message: AIMessage) -> bool:
+        """ Whether every tool call in message has a matching ToolMessage """
+        return all(call["id"] in self._tool_results for call in message.tool_calls)
+
+    def dangling_tool_calls(self) -> List[AIMessage]:
+        """ AI messages with at least one tool call that never got a result, e.g. after an interrupt """
+        return [self[self._positions[ai_id]] for ai_id in self._pending]
+
+    def without_dangling_tool_calls(self) -> List[BaseMessage]:
+        """ The history to send to a model: AI messages with unanswered tool calls left out """
+        if not self._pending:
+            return self
+        return [message for message in self if message.id not in self._pending]
+
+def add_indexed_messages(
+    left: Optional[Iterable[AnyMessage]], right: Union[AnyMessage, Iterable[AnyMessage]]
+) -> IndexedMessages:
+    """ Reducer with add_messages' semantics that returns an IndexedMessages """
+    left = IndexedMessages.of(left)
+    if not isinstance(right, list):
+        right = [right]
+    right = [message_chunk_to_message(m) for m in convert_to_messages(right)]
+    for m in right:
+        if m.id is None:
+            m.id = str(uuid.uuid4())
+
+    for i in range(len(right) - 1, -1, -1):
+        if isinstance(right[i], RemoveMessage) and right[i].id == REMOVE_ALL_MESSAGES:
+            return IndexedMessages(right[i + 1:])
+
+    # Copying the list and its indexes is a few C-level copies; the appends below only index what is new
+    merged = left.copy()
+    to_remove = set()
+    replaced = False
+    for m in right:
+        position = merged._positions.get(m.id)
+        if isinstance(m, RemoveMessage):
+            if position is None:
+                raise ValueError(f"Attempting to delete a message with an ID that doesn't exist ('{m.id}')")
+            to_remove.add(m.id)
+        elif position is not None:
+            to_remove.discard(m.id)
+            list.__setitem__(merged, position, m)
+            replaced = True
+        else:
+            list.append(merged, m)
+            merged._index(len(merged) - 1, m)
+
+    if to_remove:
+        # All removals in one pass over the list, then one pass to rebuild the indexes
+        kept = [m for m in merged if m.id not in to_remove]
+        return IndexedMessages(kept)
+    if replaced:
+        merged._reindex()
+    return merged
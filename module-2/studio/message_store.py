@@ -0,0 +1,227 @@
+""" Checkpoint serializer that stores each message once instead of once per checkpoint.
+
+A MessagesState checkpoint holds the whole message list, so a thread with T turns writes
+O(T^2) message bytes. MessageStoreSerializer writes each distinct message (keyed by a hash of its
+serialized form) once to a side table, and checkpoints hold only the ordered list of hashes.
+
+    conn = sqlite3.connect("state_db/example.db", check_same_thread=False)
+    memory = SqliteSaver(conn, serde=MessageStoreSerializer(MessageStore("state_db/example.db")))
+
+It works with any checkpointer that takes a serde, including FastSqliteSaver. Pending writes are
+per-step deltas and are serialized as usual.
+
+Deleting checkpoints (e.g. with checkpoint_retention.py) leaves their messages behind;
+MessageStore.collect_garbage deletes the ones no remaining checkpoint refers to.
+"""
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# Type tag prefix for checkpoints whose message lists were replaced by references
+REFS_PREFIX = "msgrefs+"
+REFS_KEY = "__message_refs__"
+
+class MessageStore:
+    """ Content-addressed message table, in the checkpoint database or a file of its own """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages (hash TEXT PRIMARY KEY, type TEXT NOT NULL, value BLOB NOT NULL)"
+            )
+
+    def put_many(self, messages: Dict[str, Tuple[str, bytes]]) -> None:
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO messages (hash, type, value) VALUES (?, ?, ?)",
+                [(key, type_, value) for key, (type_, value) in messages.items()],
+            )
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[str, bytes]]:
+        keys = list(keys)
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            with self.lock:
+                rows = self.conn.execute(
+                    f"SELECT hash, type, value FROM messages WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            found.update({key: (type_, value) for key, type_, value in rows})
+        return found
+
+    def collect_garbage(self, checkpoints: sqlite3.Connection, inner: Optional[SerializerProtocol] = None,
+                        batch_size: int = 500) -> int:
+        """ Mark and sweep: delete messages no checkpoint in the checkpoints database refers to.
+
+        Returns the number of messages deleted. Only messages already stored when the sweep starts
+        are candidates, and checkpoints committed while references are being collected are scanned
+        again with writers locked out, so it can run while the graph keeps writing. The lock covers
+        the graph's checkpoint writes only when the message table lives in the checkpoint database.
+        """
+        inner = inner or JsonPlusSerializer()
+        with self.lock:
+            boundary = self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM messages").fetchone()[0]
+        seen: Set[Tuple[str, str, str]] = set()
+        marked = _referenced(checkpoints, inner, seen)
+
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                marked |= _referenced(checkpoints, inner, seen)
+                garbage = [key for (key,) in self.conn.execute("SELECT hash FROM messages WHERE rowid <= ?", (boundary,))
+                           if key not in marked]
+                for start in range(0, len(garbage), batch_size):
+                    chunk = garbage[start:start + batch_size]
+                    self.conn.execute(f"DELETE FROM messages WHERE hash IN ({','.join('?' * len(chunk))})", chunk)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return len(garbage)
+
+    def close(self) -> None:
+        self.conn.close()
+
+def _referenced(checkpoints: sqlite3.Connection, inner: SerializerProtocol, seen: Set[Tuple[str, str, str]]) -> Set[str]:
+    """ Message hashes referenced by checkpoints not in seen, which are added to it """
+    keys = checkpoints.execute(
+        "SELECT thread_id, checkpoint_ns, checkpoint_id FROM checkpoints WHERE type LIKE ?", (REFS_PREFIX + "%",)
+    ).fetchall()
+    marked = set()
+    for key in keys:
+        if key in seen:
+            continue
+        seen.add(key)
+        row = checkpoints.execute(
+            "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", key
+        ).fetchone()
+        if row is None:
+            # Deleted since it was listed
+            continue
+        obj = inner.loads_typed((row[0][len(REFS_PREFIX):], row[1]))
+        for value in obj["channel_values"].values():
+            if isinstance(value, dict) and REFS_KEY in value:
+                marked.update(value[REFS_KEY])
+    return marked
+
+class MessageStoreSerializer:
+    """ SerializerProtocol wrapper that swaps message lists in checkpoints for message hashes.
+
+    Each put serializes and stores only the messages it hasn't seen: a bounded LRU maps message ids
+    to the message object last written (or loaded) under that id and its hash, so messages carried
+    over from the parent checkpoint cost a dictionary lookup. A message replaced under the same id
+    is a new object and is written again. Messages are treated as immutable, as LangGraph state is.
+    Writes use INSERT OR IGNORE, so a message that collect_garbage removed is stored again if a
+    later checkpoint refers to it after falling out of the LRU. Loading is eager: every referenced message is rehydrated when the checkpoint is loaded.
+    Loaded messages are kept in an LRU cache and handed out as copies, so reading the history of a
+    long thread deserializes each message once rather than once per checkpoint.
+    """
+
+    def __init__(self, store: MessageStore, inner: Optional[SerializerProtocol] = None, cache_size: int = 4096,
+                 recent_size: int = 4096):
+        self.store = store
+        self.inner = inner or JsonPlusSerializer()
+        self.cache_size = cache_size
+        self.recent_size = recent_size
+        self._cache: "OrderedDict[str, BaseMessage]" = OrderedDict()
+        # message id -> (message object, hash) for messages known to be in the store
+        self._recent: "OrderedDict[str, Tuple[BaseMessage, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Older checkpointers call dumps/loads for metadata; those never hold message lists
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        channel_values = obj.get("channel_values") if isinstance(obj, dict) else None
+        if not isinstance(channel_values, dict):
+            return self.inner.dumps_typed(obj)
+
+        new: Dict[str, Tuple[str, bytes]] = {}
+        written: List[Tuple[BaseMessage, str]] = []
+        replaced = dict(channel_values)
+        for channel, value in channel_values.items():
+            if isinstance(value, list) and value and all(isinstance(m, BaseMessage) for m in value):
+                replaced[channel] = {REFS_KEY: [self._ref(message, new, written) for message in value]}
+        if not any(isinstance(value, dict) and REFS_KEY in value for value in replaced.values()):
+            return self.inner.dumps_typed(obj)
+
+        # Messages must be durable before any checkpoint that points at them
+        if new:
+            self.store.put_many(new)
+        self._remember(written)
+        type_, data = self.inner.dumps_typed({**obj, "channel_values": replaced})
+        return REFS_PREFIX + type_, data
+
+    def _ref(self, message: BaseMessage, new: Dict[str, Tuple[str, bytes]],
+             written: List[Tuple[BaseMessage, str]]) -> str:
+        if message.id is not None:
+            with self._lock:
+                entry = self._recent.get(message.id)
+                # The LRU holds the object itself, so an identity match can't be a reused address
+                if entry is not None and entry[0] is message:
+                    self._recent.move_to_end(message.id)
+                    return entry[1]
+        type_, data = self.inner.dumps_typed(message)
+        key = hashlib.blake2b(type_.encode() + b"\0" + data, digest_size=16).hexdigest()
+        new[key] = (type_, data)
+        written.append((message, key))
+        return key
+
+    def _remember(self, messages: Iterable[Tuple[BaseMessage, str]]) -> None:
+        with self._lock:
+            for message, key in messages:
+                if message.id is not None:
+                    self._recent[message.id] = (message, key)
+                    self._recent.move_to_end(message.id)
+            while len(self._recent) > self.recent_size:
+                self._recent.popitem(last=False)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if not type_.startswith(REFS_PREFIX):
+            return self.inner.loads_typed(data)
+        obj = self.inner.loads_typed((type_[len(REFS_PREFIX):], payload))
+        channel_values = obj["channel_values"]
+        refs = {channel: value[REFS_KEY] for channel, value in channel_values.items()
+                if isinstance(value, dict) and REFS_KEY in value}
+        messages = self._resolve({key for keys in refs.values() for key in keys})
+        loaded = []
+        for channel, keys in refs.items():
+            channel_values[channel] = [messages[key].model_copy() for key in keys]
+            loaded += zip(channel_values[channel], keys)
+        # The next put, e.g. after resuming this checkpoint, then skips the messages it carries over
+        self._remember(loaded)
+        return obj
+
+    def _resolve(self, keys: set) -> Dict[str, BaseMessage]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+        missing = keys - found.keys()
+        if missing:
+            loaded = {key: self.inner.loads_typed(value) for key, value in self.store.get_many(missing).items()}
+            if len(loaded) < len(missing):
+                raise LookupError(f"{len(missing) - len(loaded)} referenced messages are missing from the message store")
+            found.update(loaded)
+            with self._lock:
+                self._cache.update(loaded)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return found
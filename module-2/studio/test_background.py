@@ -0,0 +1,24 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+import background
+import chatbot
+from background import BackgroundSummarizer
+
+def test_failed_summary_lets_the_turn_go_ahead(monkeypatch):
+    def fail(state):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(background, "needs_summary", lambda values, config: True)
+    monkeypatch.setattr(background, "summarize_conversation", fail)
+    graph = chatbot.workflow.compile(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "1"}}
+    graph.update_state(config, {"messages": [HumanMessage(content="hi")]}, as_node="conversation")
+
+    summarizer = BackgroundSummarizer(graph)
+    summarizer.schedule(config)
+    assert summarizer.wait(config, timeout=5) is False
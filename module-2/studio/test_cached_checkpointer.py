@@ -0,0 +1,67 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from cached_checkpointer import CachedCheckpointSaver
+
+def reply(state: MessagesState):
+    return {"messages": [AIMessage(content=f"reply {len(state['messages'])}")]}
+
+def build(checkpointer):
+    builder = StateGraph(MessagesState)
+    builder.add_node("reply", reply)
+    builder.add_edge(START, "reply")
+    builder.add_edge("reply", END)
+    return builder.compile(checkpointer=checkpointer)
+
+def test_async_runs_read_through_the_cache():
+    saver = InMemorySaver()
+    memory = CachedCheckpointSaver(saver, version_probe=lambda config: memory._version(saver.get_tuple(config)))
+    graph = build(memory)
+    config = {"configurable": {"thread_id": "1"}}
+
+    async def run():
+        for i in range(3):
+            await graph.ainvoke({"messages": [HumanMessage(content=f"question {i}")]}, config)
+        return (await graph.aget_state(config)).values["messages"]
+
+    messages = asyncio.run(run())
+    assert len(messages) == 6
+    # Every turn after the first starts from the checkpoint the previous one wrote
+    assert memory.stats()["hits"] >= 2
+
+class RecordingSaver(InMemorySaver):
+    """ InMemorySaver doesn't implement copy_thread or prune; record the calls that reach it """
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def copy_thread(self, source_thread_id, target_thread_id):
+        self.calls.append(("copy_thread", source_thread_id, target_thread_id))
+
+    def prune(self, thread_ids, *, strategy="keep_latest"):
+        self.calls.append(("prune", list(thread_ids), strategy))
+        for thread_id in thread_ids:
+            self.delete_thread(thread_id)
+
+def test_thread_management_is_forwarded_and_invalidates():
+    saver = RecordingSaver()
+    memory = CachedCheckpointSaver(saver)
+    graph = build(memory)
+    for thread_id in ("1", "2", "3"):
+        graph.invoke({"messages": [HumanMessage(content="hi")]}, {"configurable": {"thread_id": thread_id}})
+    assert memory.stats()["threads"] == 3
+
+    memory.copy_thread("1", "3")
+    assert saver.calls == [("copy_thread", "1", "3")]
+    assert memory.stats()["threads"] == 2
+
+    asyncio.run(memory.adelete_thread("1"))
+    assert memory.get_tuple({"configurable": {"thread_id": "1"}}) is None
+
+    memory.prune(["2"], strategy="delete")
+    assert saver.calls[-1] == ("prune", ["2"], "delete")
+    assert memory.get_tuple({"configurable": {"thread_id": "2"}}) is None
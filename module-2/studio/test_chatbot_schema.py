@@ -0,0 +1,21 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from langchain_core.messages import HumanMessage
+from pydantic import TypeAdapter
+
+import chatbot
+from indexed_messages import IndexedMessages
+
+def test_graph_schemas_generate():
+    for graph in (chatbot.graph, chatbot.summarizer):
+        assert "messages" in graph.get_input_jsonschema()["properties"]
+        assert "messages" in graph.get_output_jsonschema()["properties"]
+
+def test_indexed_messages_validate_as_message_list():
+    adapter = TypeAdapter(IndexedMessages)
+    messages = adapter.validate_python([{"type": "human", "content": "hi", "id": "1"}])
+    assert isinstance(messages, IndexedMessages) and messages.of(messages) is messages
+    assert isinstance(messages[0], HumanMessage)
+    assert adapter.dump_python(messages, mode="json")[0]["content"] == "hi"
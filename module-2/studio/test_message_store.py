@@ -0,0 +1,38 @@
+import sqlite3
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from message_store import MessageStore, MessageStoreSerializer
+
+SqliteSaver = pytest.importorskip("langgraph.checkpoint.sqlite").SqliteSaver
+
+def reply(state: MessagesState):
+    return {"messages": [AIMessage(content=f"reply {len(state['messages'])}")]}
+
+def build(path: str, serde: MessageStoreSerializer):
+    builder = StateGraph(MessagesState)
+    builder.add_node("reply", reply)
+    builder.add_edge(START, "reply")
+    builder.add_edge("reply", END)
+    return builder.compile(checkpointer=SqliteSaver(sqlite3.connect(path, check_same_thread=False), serde=serde))
+
+def test_each_message_is_serialized_once(tmp_path):
+    serde = MessageStoreSerializer(MessageStore(str(tmp_path / "db")))
+    serialized = []
+    dumps_typed = serde.inner.dumps_typed
+    serde.inner.dumps_typed = lambda obj: (serialized.append(obj) if isinstance(obj, (AIMessage, HumanMessage)) else None,
+                                           dumps_typed(obj))[1]
+    graph = build(str(tmp_path / "db"), serde)
+    config = {"configurable": {"thread_id": "1"}}
+    for i in range(20):
+        graph.invoke({"messages": [HumanMessage(content=f"question {i}")]}, config)
+    assert len(serialized) == 40
+
+    # A message replaced under the same id is a new object, so it is written again
+    last = graph.get_state(config).values["messages"][-1]
+    graph.update_state(config, {"messages": [AIMessage(content="edited", id=last.id)]})
+    reloaded = build(str(tmp_path / "db"), MessageStoreSerializer(MessageStore(str(tmp_path / "db"))))
+    messages = reloaded.get_state(config).values["messages"]
+    assert len(messages) == 40 and messages[-1].content == "edited"
@@ -2,8 +2,12 @@ from langchain_core.messages import SystemMessage
 from langchain_openai import ChatOpenAI
 
 from langgraph.graph import START, StateGraph, MessagesState
-from langgraph.prebuilt import tools_condition, ToolNode
+from langgraph.prebuilt import tools_condition
 
+from parallel_tools import ParallelToolNode
+from tool_cache import cacheable
+
+@cacheable()
 def add(a: int, b: int) -> int:
     """Adds a and b.
 
@@ -13,6 +17,7 @@ def add(a: int, b: int) -> int:
     """
     return a + b
 
+@cacheable()
 def multiply(a: int, b: int) -> int:
     """Multiplies a and b.
 
@@ -22,6 +27,7 @@ def multiply(a: int, b: int) -> int:
     """
     return a * b
 
+@cacheable()
 def divide(a: int, b: int) -> float:
     """Adds a and b.
 
@@ -31,6 +37,7 @@ def divide(a: int, b: int) -> float:
     """
     return a / b
 
+# Pure tools: repeated calls with the same arguments are served from their cache
 tools = [add, multiply, divide]
 
 # Define LLM with bound tools
@@ -47,7 +54,8 @@ def assistant(state: MessagesState):
 # Build graph
 builder = StateGraph(MessagesState)
 builder.add_node("assistant", assistant)
-builder.add_node("tools", ToolNode(tools))
+# Independent tool calls from one turn run concurrently, results in tool_call order
+builder.add_node("tools", ParallelToolNode(tools, max_parallelism=8, timeout=30))
 builder.add_edge(START, "assistant")
 builder.add_conditional_edges(
     "assistant",
@@ -0,0 +1,154 @@
+""" Tool node for plain function tools that runs a turn's tool calls concurrently.
+
+When the model asks for several tool calls in one message, ParallelToolNode runs them on a thread
+pool (at most max_parallelism at a time), gives each a timeout, and returns the ToolMessages in the
+same order as the tool calls. A call that fails or times out returns an error ToolMessage instead,
+so the model can see what went wrong and the other results still come back.
+
+It covers what the agents here use ToolNode for, not all of ToolNode: tools can't take
+InjectedState, InjectedStore or InjectedToolCallId arguments or return a Command, and there is no
+handle_tool_errors option, since errors always become error ToolMessages.
+
+    builder.add_node("tools", ParallelToolNode(tools, max_parallelism=8, timeouts={"lookup": 5.0}))
+
+Tools marked with tool_cache.cacheable are answered from their cache when called again with the
+same arguments; cache_stats() reports hits and misses per tool.
+
+A call's timeout runs from when the call starts, so waiting behind max_parallelism other calls
+doesn't count against it. Python can't stop a running thread, so a call that times out keeps
+running in the background; its result is discarded and its slot goes to the next waiting call.
+"""
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Dict, Optional, Sequence, Union
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langchain_core.tools import BaseTool, StructuredTool
+
+from tool_cache import MISSING, ToolCache, cache_for
+
+# How often to look for calls that have started, while some with a timeout are still waiting for a slot
+START_POLL_INTERVAL = 0.05
+
+class _Attempt:
+    """ One tool call of a step: when it started, and whether its concurrency slot was given back """
+
+    def __init__(self, call: dict, timeout: Optional[float]):
+        self.call = call
+        self.timeout = timeout
+        self.started: Optional[float] = None
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def deadline(self) -> Optional[float]:
+        return None if self.timeout is None or self.started is None else self.started + self.timeout
+
+    def close(self, slots: threading.Semaphore) -> bool:
+        """ Give back the call's slot, once: True for whichever of the worker or a timeout gets here first """
+        with self.lock:
+            if self.closed:
+                return False
+            self.closed = True
+        slots.release()
+        return True
+
+class ParallelToolNode:
+    """ Runs the tool calls of the last AI message concurrently, returning results in call order """
+
+    def __init__(
+        self,
+        tools: Sequence[Union[BaseTool, Callable]],
+        max_parallelism: int = 8,
+        timeout: Optional[float] = None,
+        timeouts: Optional[Dict[str, float]] = None,
+        messages_key: str = "messages",
+    ):
+        self.tools = {tool.name: tool for tool in (t if isinstance(t, BaseTool) else StructuredTool.from_function(t)
+                                                    for t in tools)}
+        self.caches: Dict[str, ToolCache] = {name: cache for name, tool in self.tools.items()
+                                             if (cache := cache_for(tool)) is not None}
+        self.max_parallelism = max_parallelism
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.messages_key = messages_key
+
+    def _run(self, call: dict, config: RunnableConfig) -> ToolMessage:
+        tool = self.tools.get(call["name"])
+        if tool is None:
+            return self._error(call, f"Error: {call['name']} is not a valid tool, try one of [{', '.join(self.tools)}].")
+        cache = self.caches.get(call["name"])
+        key = ToolCache.key(call["args"]) if cache else None
+        content = cache.get(key) if cache else MISSING
+        if content is MISSING:
+            try:
+                content = tool.invoke(call["args"], config)
+            except Exception as e:
+                return self._error(call, f"Error: {repr(e)}\n Please fix your mistakes.")
+            if cache:
+                cache.put(key, content)
+        if not isinstance(content, str):
+            # Same as ToolNode: JSON where possible, so numbers and dicts reach the model unchanged
+            try:
+                content = json.dumps(content, ensure_ascii=False)
+            except (TypeError, ValueError):
+                content = str(content)
+        return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"])
+
+    def _attempt(self, attempt: _Attempt, slots: threading.Semaphore, config: RunnableConfig) -> ToolMessage:
+        slots.acquire()
+        attempt.started = time.monotonic()
+        try:
+            return self._run(attempt.call, config)
+        finally:
+            attempt.close(slots)
+
+    def cache_stats(self) -> Dict[str, dict]:
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+    def _error(self, call: dict, content: str) -> ToolMessage:
+        return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"], status="error")
+
+    def __call__(self, state: dict, config: RunnableConfig) -> dict:
+        message: AIMessage = state[self.messages_key][-1]
+        calls = message.tool_calls
+        if len(calls) <= 1 and not (self.timeout or self.timeouts):
+            return {self.messages_key: [self._run(call, config) for call in calls]}
+
+        # A fresh pool per step with a thread per call, so calls left running by a timeout never block
+        # the next step; the semaphore is what limits how many calls run at once
+        slots = threading.Semaphore(max(1, self.max_parallelism))
+        attempts = [_Attempt(call, self.timeouts.get(call["name"], self.timeout)) for call in calls]
+        executor = ContextThreadPoolExecutor(max_workers=len(calls))
+        try:
+            futures: Dict[Future, int] = {executor.submit(self._attempt, attempt, slots, config): i
+                                          for i, attempt in enumerate(attempts)}
+            results: Dict[int, ToolMessage] = {}
+            pending = set(futures)
+            while pending:
+                now = time.monotonic()
+                deadlines = [deadline for f in pending if (deadline := attempts[futures[f]].deadline()) is not None]
+                waiting = any(attempts[futures[f]].timeout is not None and attempts[futures[f]].started is None
+                              for f in pending)
+                timeout = max(0.0, min(deadlines) - now) if deadlines else None
+                if waiting:
+                    timeout = START_POLL_INTERVAL if timeout is None else min(timeout, START_POLL_INTERVAL)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[futures[future]] = future.result()
+                now = time.monotonic()
+                for future in list(pending):
+                    attempt = attempts[futures[future]]
+                    deadline = attempt.deadline()
+                    # A call that finishes right at its deadline keeps its result
+                    if deadline is not None and now >= deadline and attempt.close(slots):
+                        pending.discard(future)
+                        call = attempt.call
+                        results[futures[future]] = self._error(
+                            call, f"Error: {call['name']} timed out after {attempt.timeout} seconds.")
+            return {self.messages_key: [results[i] for i in range(len(calls))]}
+        finally:
+            executor.shutdown(wait=False)
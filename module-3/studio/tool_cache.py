@@ -0,0 +1,104 @@
+""" Declarative result caching for pure or slowly changing tools.
+
+Mark a tool and ParallelToolNode serves repeated calls with the same arguments from a TTL LRU
+cache instead of running the tool again, within a conversation and across threads and users of
+the same process:
+
+    @cacheable()                       # pure: no expiry
+    def add(a: int, b: int) -> int: ...
+
+    @cacheable(ttl=300, maxsize=256)   # works on @tool objects as well
+    @tool
+    def get_current_weather(city: str) -> str: ...
+
+Arguments are canonicalized (keys sorted, JSON-encoded) so {"a": 1, "b": 2} and {"b": 2, "a": 1}
+share an entry. Only successful results are cached.
+"""
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from langchain_core.tools import BaseTool
+
+T = TypeVar("T", Callable, BaseTool)
+
+MISSING = object()
+
+# Caches of marked BaseTool objects by id(tool). They stay out of tool.metadata, which is copied into
+# every callback and trace run, and tools are unhashable pydantic models, hence ids plus a finalizer
+_tool_caches: Dict[int, "ToolCache"] = {}
+
+class ToolCache:
+    """ Thread-safe LRU of tool results with an optional time to live, in seconds """
+
+    def __init__(self, ttl: Optional[float] = None, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    @staticmethod
+    def key(args: Any) -> str:
+        return json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+
+    def get(self, key: str) -> Any:
+        """ The cached result, or MISSING """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {**self._stats, "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                    "size": len(self._entries)}
+
+def cacheable(ttl: Optional[float] = None, maxsize: int = 1024) -> Callable[[T], T]:
+    """ Mark a tool function or BaseTool as safe to cache; the tool itself is returned unchanged """
+
+    def mark(tool: T) -> T:
+        cache = ToolCache(ttl, maxsize)
+        if isinstance(tool, BaseTool):
+            _tool_caches[id(tool)] = cache
+            weakref.finalize(tool, _tool_caches.pop, id(tool), None)
+        else:
+            tool.__tool_cache__ = cache
+        return tool
+
+    return mark
+
+def cache_for(tool: Any) -> Optional[ToolCache]:
+    """ The cache a tool was marked with, if any """
+    if isinstance(tool, BaseTool):
+        cache = _tool_caches.get(id(tool))
+        if cache is None:
+            # Tools built from a marked function, e.g. by StructuredTool.from_function
+            cache = getattr(tool.func, "__tool_cache__", None) if getattr(tool, "func", None) else None
+        return cache
+    return getattr(tool, "__tool_cache__", None)
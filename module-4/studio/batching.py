@@ -0,0 +1,89 @@
+import time
+from typing import Callable, List, Sequence, TypeVar
+
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+class AdaptiveBatcher:
+    """Batch size controller that grows on fast, clean batches and halves on slow or failed ones."""
+
+    def __init__(self, min_size: int = 1, max_size: int = 32, initial_size: int = 4, target_latency: float = 10.0):
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.size = min(max(initial_size, self.min_size), self.max_size)
+        self.target_latency = target_latency
+
+    def record_success(self, latency: float) -> None:
+        """ Grow by half again when the batch came back under the latency target, otherwise shrink """
+        if latency <= self.target_latency:
+            self.size = min(self.max_size, self.size + max(1, self.size // 2))
+        else:
+            self.shrink()
+
+    def record_failure(self) -> None:
+        self.shrink()
+
+    def shrink(self) -> None:
+        self.size = max(self.min_size, self.size // 2)
+
+def run_adaptive_batches(
+    items: Sequence[T],
+    call_batch: Callable[[List[T]], List[R]],
+    batcher: AdaptiveBatcher,
+    max_concurrency: int = 8,
+) -> List[R]:
+    """ Apply call_batch over items in adaptively sized batches, returning results in input order.
+
+    Each wave runs up to max_concurrency batches at the current batch size. The slowest batch in
+    the wave drives the next size; failed batches are re-queued and retried smaller. A failure at
+    the minimum batch size is raised to the caller.
+    """
+    # A wave of zero batches would never make progress, so 0 or less means one at a time
+    max_concurrency = max(1, max_concurrency)
+    results: List[tuple[int, List[R]]] = []
+    pending: List[tuple[int, List[T]]] = []
+    next_index = 0
+    items = list(items)
+
+    def timed(batch: List[T]):
+        start = time.monotonic()
+        out = call_batch(batch)
+        return out, time.monotonic() - start
+
+    # Copies the caller's context into workers, so callbacks (tracing, streaming) follow each batch
+    with ContextThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        while next_index < len(items) or pending:
+            # Cut new batches at the current size until the wave is full
+            wave = pending[:max_concurrency]
+            pending = pending[max_concurrency:]
+            while len(wave) < max_concurrency and next_index < len(items):
+                batch = items[next_index:next_index + batcher.size]
+                wave.append((next_index, batch))
+                next_index += len(batch)
+
+            futures = [(start, batch, executor.submit(timed, batch)) for start, batch in wave]
+            slowest = 0.0
+            failed = False
+            for start, batch, future in futures:
+                try:
+                    out, latency = future.result()
+                except Exception:
+                    if len(batch) <= batcher.min_size:
+                        raise
+                    failed = True
+                    # Split the failed batch so the retry is smaller regardless of the new size
+                    half = len(batch) // 2
+                    pending.extend([(start, batch[:half]), (start + half, batch[half:])])
+                    continue
+                slowest = max(slowest, latency)
+                results.append((start, out))
+
+            if failed:
+                batcher.record_failure()
+            elif futures:
+                batcher.record_success(slowest)
+
+    results.sort(key=lambda r: r[0])
+    return [r for _, out in results for r in out]
@@ -0,0 +1,96 @@
+""" Benchmark Send() fan-out overhead in map_reduce.py with a stub model.
+
+Usage: python bench_fanout.py [--sizes 10 100 1000 10000] [--chunk-size 100]
+
+For each width, runs the map_reduce graph once per map mode with a model that answers instantly, so
+the wall time is framework overhead. Reports per-branch scheduling overhead, the cost of folding one
+joke per branch with the operator.add reducer, and peak traced memory.
+"""
+import argparse
+import functools
+import operator
+import os
+import time
+import tracemalloc
+
+# map_reduce builds a ChatOpenAI client at import time; the stub below replaces it before any call
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import map_reduce
+
+class StubStructuredModel:
+    """ Instant stand-in for model.with_structured_output(schema) """
+
+    def __init__(self, schema, num_subjects: int):
+        self.schema = schema
+        self.num_subjects = num_subjects
+
+    def invoke(self, prompt):
+        name = self.schema.__name__
+        if name == "Subjects":
+            return self.schema(subjects=[f"subject-{i}" for i in range(self.num_subjects)])
+        if name == "Joke":
+            return self.schema(joke=f"joke: {prompt}")
+        if name == "Jokes":
+            n = int(prompt.split("Return exactly ")[1].split()[0])
+            return self.schema(jokes=[f"joke {i}" for i in range(n)])
+        if name == "JokeRating":
+            return self.schema(score=len(prompt) % 10)
+        return self.schema(id=0)
+
+    def batch(self, prompts, config=None):
+        return [self.invoke(prompt) for prompt in prompts]
+
+class StubModel:
+    def __init__(self, num_subjects: int):
+        self.num_subjects = num_subjects
+
+    def with_structured_output(self, schema, **kwargs):
+        return StubStructuredModel(schema, self.num_subjects)
+
+def run_graph(num_subjects: int, configurable: dict) -> float:
+    map_reduce.model = StubModel(num_subjects)
+    start = time.perf_counter()
+    result = map_reduce.graph.invoke({"topic": "benchmarks"}, {"configurable": configurable, "recursion_limit": 100})
+    elapsed = time.perf_counter() - start
+    assert len(result["jokes"]) == num_subjects
+    return elapsed
+
+def peak_memory(num_subjects: int, configurable: dict) -> int:
+    tracemalloc.start()
+    try:
+        run_graph(num_subjects, configurable)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def reducer_cost(num_subjects: int) -> float:
+    """ Time to fold one single-item update per branch, as the jokes channel does """
+    updates = [[f"joke {i}"] for i in range(num_subjects)]
+    start = time.perf_counter()
+    functools.reduce(operator.add, updates, [])
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--chunk-size", type=int, default=100)
+    args = parser.parse_args()
+
+    modes = {
+        "send": {"map_mode": "send"},
+        f"chunked/{args.chunk_size}": {"map_mode": "batch", "send_chunk_size": args.chunk_size,
+                                       "initial_batch_size": args.chunk_size, "max_batch_size": args.chunk_size},
+    }
+
+    print(f"{'subjects':>8}  {'mode':<12}  {'total s':>9}  {'us/branch':>10}  {'reducer ms':>10}  {'peak MiB':>9}")
+    for num_subjects in args.sizes:
+        reducer_ms = reducer_cost(num_subjects) * 1e3
+        for mode, configurable in modes.items():
+            elapsed = run_graph(num_subjects, configurable)
+            peak = peak_memory(num_subjects, configurable) / 2**20
+            per_branch_us = elapsed / num_subjects * 1e6
+            print(f"{num_subjects:>8}  {mode:<12}  {elapsed:>9.3f}  {per_branch_us:>10.1f}  {reducer_ms:>10.2f}  {peak:>9.1f}")
+
+if __name__ == "__main__":
+    main()
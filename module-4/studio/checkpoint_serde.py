@@ -0,0 +1,27 @@
+""" Checkpoint serializer for the module 4 graphs' own state types.
+
+ProcessedSet, LogBatch (with its column types) and SharedRef are stored in checkpointed state.
+LangGraph only deserializes types it has been told about: unregistered ones log a warning today
+and are blocked under LANGGRAPH_STRICT_MSGPACK=true, where they come back as plain dicts. Compile
+with a checkpointer whose serde registers them:
+
+    checkpointer = SqliteSaver(conn, serde=checkpoint_serde())
+    graph = entry_builder.compile(checkpointer=checkpointer)
+"""
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# (module, class) pairs allowed in checkpoints, in addition to LangGraph's built-in safe types
+STATE_TYPES = [
+    ("processed_set", "ProcessedSet"),
+    ("log_batch", "LogBatch"),
+    ("log_batch", "StringColumn"),
+    ("log_batch", "CategoryColumn"),
+    ("shared_state", "SharedRef"),
+]
+
+def checkpoint_serde() -> JsonPlusSerializer:
+    try:
+        return JsonPlusSerializer(allowed_msgpack_modules=STATE_TYPES)
+    except TypeError:
+        # langgraph-checkpoint releases before the msgpack allowlist deserialize every type
+        return JsonPlusSerializer()
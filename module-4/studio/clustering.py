@@ -0,0 +1,131 @@
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from log_batch import LogBatch
+
+_token = re.compile(r"[a-z0-9]+")
+
+def hashed_tfidf(fields: Dict[str, Sequence[Optional[str]]], dim: int = 256, idf: bool = True) -> np.ndarray:
+    """ TF-IDF over hashed word tokens, one L2-normalised float32 row per record.
+
+    Tokens are prefixed with their field name before hashing, so "chroma" in a question and in
+    feedback land in different buckets. Term frequencies are log-scaled. IDF weights depend on the
+    batch, so pass idf=False when rows must stay comparable across batches.
+    """
+    num_rows = len(next(iter(fields.values()))) if fields else 0
+    rows: List[int] = []
+    buckets: List[int] = []
+    for name, values in fields.items():
+        for row, value in enumerate(values):
+            if not value:
+                continue
+            for token in _token.findall(value.lower()):
+                rows.append(row)
+                buckets.append(zlib.crc32(f"{name}:{token}".encode()) % dim)
+
+    counts = np.zeros((num_rows, dim), dtype=np.float32)
+    np.add.at(counts, (np.array(rows, dtype=np.int64), np.array(buckets, dtype=np.int64)), 1.0)
+    features = np.log1p(counts)
+    if idf:
+        document_frequency = np.count_nonzero(counts, axis=0)
+        features *= (np.log((1 + num_rows) / (1 + document_frequency)) + 1).astype(np.float32)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return features / norms
+
+def nearest_center(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    distances = (points ** 2).sum(axis=1, keepdims=True) - 2 * points @ centers.T + (centers ** 2).sum(axis=1)
+    return np.argmin(distances, axis=1)
+
+def nearest_distance(points: np.ndarray, centers: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """ Squared distance from each point to its nearest center, an N x K block of chunk_size rows at a time """
+    center_norms = (centers ** 2).sum(axis=1)
+    closest = np.empty(len(points), dtype=np.float32)
+    for i in range(0, len(points), chunk_size):
+        chunk = points[i:i + chunk_size]
+        distances = (chunk ** 2).sum(axis=1, keepdims=True) - 2 * chunk @ centers.T + center_norms
+        # The expanded form can dip just below zero through rounding
+        closest[i:i + chunk_size] = np.maximum(distances.min(axis=1), 0)
+    return closest
+
+def minibatch_kmeans(
+    points: np.ndarray, k: int, batch_size: int = 1024, iterations: int = 100, seed: int = 0, chunk_size: int = 65536
+) -> tuple[np.ndarray, np.ndarray]:
+    """ Mini-batch k-means (Sculley, 2010) with k-means++ seeding. Returns (centers, labels) """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(points))
+
+    # k-means++ seeding on a sample keeps initialisation cost independent of the number of points
+    sample = points[rng.choice(len(points), size=min(len(points), max(10 * k, batch_size)), replace=False)]
+    centers = [sample[rng.integers(len(sample))]]
+    closest = ((sample - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = closest.sum()
+        choice = rng.choice(len(sample), p=closest / total) if total > 0 else rng.integers(len(sample))
+        centers.append(sample[choice])
+        closest = np.minimum(closest, ((sample - sample[choice]) ** 2).sum(axis=1))
+    centers = np.array(centers, dtype=np.float32)
+
+    counts = np.zeros(k, dtype=np.int64)
+    for _ in range(iterations):
+        batch = points[rng.integers(len(points), size=min(batch_size, len(points)))]
+        labels = nearest_center(batch, centers)
+        for center in np.unique(labels):
+            members = batch[labels == center]
+            counts[center] += len(members)
+            # Per-center learning rate decays with the number of points it has absorbed
+            rate = len(members) / counts[center]
+            centers[center] += rate * (members.mean(axis=0) - centers[center])
+
+    labels = np.concatenate([nearest_center(points[i:i + chunk_size], centers) for i in range(0, len(points), chunk_size)])
+    return centers, labels
+
+def grow_centers(points: np.ndarray, centers: np.ndarray, k: int, seed: int = 0) -> np.ndarray:
+    """ Add centers up to k by continuing k-means++ seeding from the existing ones over new points.
+
+    Points that coincide with a center already add nothing, so fewer than k centers may come back.
+    """
+    if len(centers) >= k or not len(points):
+        return centers
+    rng = np.random.default_rng(seed)
+    # float64 so the sampling probabilities sum to 1 within numpy's tolerance
+    closest = nearest_distance(points, centers).astype(np.float64)
+    added = []
+    while len(centers) + len(added) < k:
+        total = closest.sum()
+        if total <= 0:
+            break
+        choice = rng.choice(len(points), p=closest / total)
+        added.append(points[choice])
+        closest = np.minimum(closest, ((points - points[choice]) ** 2).sum(axis=1))
+    return np.vstack([centers, np.array(added, dtype=np.float32)]) if added else centers
+
+def failure_features(failures: LogBatch, dim: int = 256, idf: bool = True) -> np.ndarray:
+    return hashed_tfidf({
+        "question": failures.question.to_list(),
+        "feedback": failures.feedback.to_list(),
+        "grader": failures.grader.to_list(),
+    }, dim, idf)
+
+def cluster_failures(failures: LogBatch, k: int = 8, dim: int = 256, seed: int = 0) -> List[dict]:
+    """ Group failures into at most k clusters, largest first.
+
+    Each cluster is {"count", "representative"}, where the representative is the failure closest to
+    the cluster center, as a Log dict.
+    """
+    if not len(failures):
+        return []
+    points = failure_features(failures, dim)
+    centers, labels = minibatch_kmeans(points, k, seed=seed)
+
+    clusters = []
+    for center in range(len(centers)):
+        members = np.flatnonzero(labels == center)
+        if not len(members):
+            continue
+        closest = members[np.argmin(((points[members] - centers[center]) ** 2).sum(axis=1))]
+        clusters.append({"count": int(len(members)), "representative": failures.take(np.array([closest])).to_logs()[0]})
+    return sorted(clusters, key=lambda cluster: cluster["count"], reverse=True)
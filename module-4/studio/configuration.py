@@ -0,0 +1,73 @@
+import os
+from dataclasses import dataclass, fields
+from typing import Any, Optional, Type, TypeVar
+
+from langchain_core.runnables import RunnableConfig
+
+def _coerce(type_: type, value: Any) -> Any:
+    # bool("false") is True, so booleans are parsed from their usual spellings instead
+    if type_ is bool:
+        return value if isinstance(value, bool) else str(value).strip().lower() in {"1", "true", "yes"}
+    return type_(value)
+
+C = TypeVar("C", bound="_Configurable")
+
+@dataclass(kw_only=True)
+class _Configurable:
+    """Shared loader for the configuration dataclasses below."""
+
+    @classmethod
+    def from_runnable_config(
+        cls: Type[C], config: Optional[RunnableConfig] = None
+    ) -> C:
+        """Create a Configuration instance from a RunnableConfig."""
+        configurable = (
+            config["configurable"] if config and "configurable" in config else {}
+        )
+        values: dict[str, Any] = {
+            f.name: os.environ.get(f.name.upper(), configurable.get(f.name))
+            for f in fields(cls)
+            if f.init
+        }
+        # Environment variables arrive as strings, so coerce to the field type
+        types = {f.name: f.type for f in fields(cls)}
+        return cls(**{k: _coerce(types[k], v) for k, v in values.items() if v is not None and v != ""})
+
+@dataclass(kw_only=True)
+class Configuration(_Configurable):
+    """The configurable fields for the map_reduce and sub_graphs graphs."""
+    # How generate_joke work is fanned out: "send" (one Send per subject), "batch" (adaptive batches),
+    # or "pipelined" (jokes start while generate_topics is still streaming subjects)
+    map_mode: str = "send"
+    # Cosine similarity above which near-duplicate subjects share one map branch; 0 disables merging
+    dedup_threshold: float = 0.0
+    # Subjects per Send for map_mode="batch"; 0 sends the whole list to one branch
+    send_chunk_size: int = 0
+    # Adaptive batching bounds for map_mode="batch"
+    min_batch_size: int = 1
+    max_batch_size: int = 32
+    initial_batch_size: int = 4
+    # Batches slower than this (seconds) shrink the next batch size
+    target_batch_latency: float = 10.0
+    # Upper bound on concurrent model calls inside a single node
+    max_concurrency: int = 8
+    # How best_joke reduces the jokes: "single" (one prompt with every joke), "tournament",
+    # or "streaming" (each map branch scores its joke and folds it into a running best)
+    reduce_mode: str = "single"
+    # Jokes compared per call in each tournament round
+    tournament_group_size: int = 8
+    # Clusters of failures summarized by the sub_graphs failure analysis
+    failure_clusters: int = 8
+    # Whether failure analysis calls the model for fa_summary. analyze_in_windows turns it off per window
+    # and summarizes the merged clusters once at the end
+    summarize_failures: bool = True
+    # Worker processes for clean_logs; 0 cleans in the graph's own process
+    clean_workers: int = 0
+    # Logs per chunk handed to each clean_logs worker
+    clean_chunk_size: int = 50000
+
+@dataclass(kw_only=True)
+class ResearchConfiguration(_Configurable):
+    """The configurable fields for the research assistant."""
+    # Cosine similarity above which analysts with near-identical focus share one interview; 0 disables merging
+    dedup_threshold: float = 0.0
@@ -0,0 +1,107 @@
+import zlib
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+def ngram_vectors(texts: Sequence[str], n: int = 3, dim: int = 4096) -> np.ndarray:
+    """ Hashed character n-gram counts, one L2-normalised row per text """
+    rows: List[int] = []
+    buckets: List[int] = []
+    for row, text in enumerate(texts):
+        padded = f" {' '.join(text.lower().split())} "
+        # crc32 rather than hash() so buckets are stable across processes
+        for i in range(max(1, len(padded) - n + 1)):
+            rows.append(row)
+            buckets.append(zlib.crc32(padded[i:i + n].encode()) % dim)
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    np.add.at(vectors, (np.array(rows, dtype=np.int64), np.array(buckets, dtype=np.int64)), 1.0)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class NearDuplicateIndex:
+    """ Incremental near-duplicate detector over a growing set of representative texts.
+
+    Representatives live in a preallocated matrix whose capacity doubles as it fills, and add_many
+    compares texts a block at a time with one matrix product against the representatives.
+    """
+
+    def __init__(self, threshold: float = 0.9, n: int = 3, dim: int = 4096, block_size: int = 512):
+        self.threshold = threshold
+        self.n = n
+        self.dim = dim
+        self.block_size = block_size
+        self._vectors = np.zeros((16, dim), dtype=np.float32)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _append(self, vectors: np.ndarray) -> None:
+        needed = self._size + len(vectors)
+        if needed > len(self._vectors):
+            grown = np.zeros((max(needed, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        self._vectors[self._size:needed] = vectors
+        self._size = needed
+
+    def add(self, text: str) -> int:
+        """ Return the index of the representative text is merged into, adding it as a new one if none is similar enough """
+        return int(self.add_many([text])[0])
+
+    def add_many(self, texts: Sequence[str]) -> np.ndarray:
+        """ add() for each text in order, with the similarity work done per block of texts """
+        vectors = ngram_vectors(texts, self.n, self.dim)
+        positions = np.empty(len(texts), dtype=np.int64)
+        for start in range(0, len(vectors), self.block_size):
+            block = vectors[start:start + self.block_size]
+            existing = self._size
+            if existing:
+                similarities = block @ self._vectors[:existing].T
+                best = similarities.argmax(axis=1)
+                best_similarity = similarities[np.arange(len(block)), best]
+            else:
+                best = np.zeros(len(block), dtype=np.int64)
+                best_similarity = np.full(len(block), -np.inf, dtype=np.float32)
+            # Texts in the block can also match representatives created earlier in the same block
+            within = block @ block.T
+            new_rows: List[int] = []
+            for j in range(len(block)):
+                position, similarity = best[j], best_similarity[j]
+                if new_rows:
+                    local = within[j, new_rows]
+                    k = int(np.argmax(local))
+                    # Strictly greater, so ties go to the older representative as in a sequential scan
+                    if local[k] > similarity:
+                        position, similarity = existing + k, local[k]
+                if similarity >= self.threshold:
+                    positions[start + j] = position
+                else:
+                    positions[start + j] = existing + len(new_rows)
+                    new_rows.append(j)
+            self._append(block[new_rows])
+        return positions
+
+def group_near_duplicates(
+    items: Sequence[T], threshold: float = 0.9, key: Optional[Callable[[T], str]] = None
+) -> List[List[T]]:
+    """ Group items whose text has cosine similarity of at least threshold with a group's first item.
+
+    Groups keep first-seen order and the first item of each group is its representative. A threshold
+    of 0 or less disables merging and returns one group per item.
+    """
+    if threshold <= 0:
+        return [[item] for item in items]
+    key = key or str
+    items = list(items)
+    positions = NearDuplicateIndex(threshold).add_many([key(item) for item in items])
+    groups: List[List[T]] = []
+    for item, position in zip(items, positions.tolist()):
+        if position == len(groups):
+            groups.append([item])
+        else:
+            groups[position].append(item)
+    return groups
@@ -0,0 +1,14 @@
+from typing import Any, List, Sequence
+
+from langgraph.constants import Send
+
+def chunked_sends(node: str, items: Sequence[Any], chunk_size: int, key: str, **shared: Any) -> List[Send]:
+    """ Fan items out to node with one Send per chunk of chunk_size items instead of one per item.
+
+    Each Send carries {key: chunk, **shared}. A chunk_size of 0 or less sends every item in a single
+    branch. Fewer, larger branches cut per-branch scheduling and reducer overhead on very wide maps.
+    """
+    items = list(items)
+    if chunk_size <= 0:
+        return [Send(node, {key: items, **shared})]
+    return [Send(node, {key: items[i:i + chunk_size], **shared}) for i in range(0, len(items), chunk_size)]
@@ -0,0 +1,60 @@
+import json
+import re
+from typing import List, Optional
+
+class JsonStringListParser:
+    """ Incrementally pull completed string items out of a list field of a streamed JSON object.
+
+    Feed it the argument fragments of a streamed tool call, e.g. '{"subj', 'ects": ["a", "b', ...',
+    and each call returns only the items whose closing quote has arrived since the last call.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.buffer = ""
+        self.done = False
+        self._pos: Optional[int] = None
+        self._start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+
+    def feed(self, fragment: str) -> List[str]:
+        self.buffer += fragment
+        items: List[str] = []
+        if self._pos is None:
+            match = self._start.search(self.buffer)
+            if not match:
+                return items
+            self._pos = match.end()
+
+        buffer = self.buffer
+        while not self.done:
+            i = self._pos
+            while i < len(buffer) and buffer[i] in " \t\r\n,":
+                i += 1
+            if i >= len(buffer):
+                self._pos = i
+                break
+            if buffer[i] == "]":
+                self.done = True
+                self._pos = i + 1
+                break
+            if buffer[i] != '"':
+                raise ValueError(f"Expected a string item in '{self.key}', got {buffer[i]!r}")
+
+            # Find the closing quote, skipping escaped characters
+            j = i + 1
+            escaped = False
+            while j < len(buffer):
+                if escaped:
+                    escaped = False
+                elif buffer[j] == "\\":
+                    escaped = True
+                elif buffer[j] == '"':
+                    break
+                j += 1
+            if j >= len(buffer):
+                # The item is still being streamed, resume from its opening quote next time
+                self._pos = i
+                break
+            items.append(json.loads(buffer[i:j + 1]))
+            self._pos = j + 1
+        return items
@@ -0,0 +1,186 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import core_schema
+
+@dataclass(frozen=True)
+class StringColumn:
+    """ Offset-encoded strings: value i is data[offsets[i]:offsets[i + 1]] as UTF-8, or None where not valid """
+    data: np.ndarray  # uint8
+    offsets: np.ndarray  # int64, len(column) + 1
+    valid: np.ndarray  # bool
+
+    @classmethod
+    def from_values(cls, values: Sequence[Optional[str]]) -> "StringColumn":
+        encoded = [b"" if value is None else value.encode() for value in values]
+        lengths = np.fromiter((len(value) for value in encoded), dtype=np.int64, count=len(encoded))
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).copy()
+        valid = np.fromiter((value is not None for value in values), dtype=bool, count=len(values))
+        return cls(data, offsets, valid)
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        if not self.valid[i]:
+            return None
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode()
+
+    def to_list(self) -> List[Optional[str]]:
+        raw = self.data.tobytes()
+        return [raw[start:end].decode() if ok else None
+                for start, end, ok in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist(), self.valid.tolist())]
+
+    def take(self, indices: np.ndarray) -> "StringColumn":
+        """ Gather rows by index without decoding any strings """
+        starts = self.offsets[indices]
+        lengths = self.offsets[indices + 1] - starts
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1], dtype=np.int64)
+        return StringColumn(self.data[positions], offsets, self.valid[indices])
+
+    @classmethod
+    def concat(cls, columns: Sequence["StringColumn"]) -> "StringColumn":
+        bases = np.cumsum([0] + [len(column.data) for column in columns[:-1]])
+        offsets = np.concatenate([[0]] + [column.offsets[1:] + base for column, base in zip(columns, bases)])
+        return cls(np.concatenate([column.data for column in columns]), offsets.astype(np.int64),
+                   np.concatenate([column.valid for column in columns]))
+
+@dataclass(frozen=True)
+class CategoryColumn:
+    """ Dictionary-encoded strings for low-cardinality fields; code -1 means missing """
+    codes: np.ndarray  # int32
+    categories: List[str]
+
+    @classmethod
+    def from_values(cls, values: Sequence[Optional[str]]) -> "CategoryColumn":
+        lookup: dict = {}
+        codes = np.fromiter(
+            (-1 if value is None else lookup.setdefault(value, len(lookup)) for value in values),
+            dtype=np.int32, count=len(values),
+        )
+        return cls(codes, list(lookup))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def to_list(self) -> List[Optional[str]]:
+        return [None if code < 0 else self.categories[code] for code in self.codes.tolist()]
+
+    def equals(self, value: str) -> np.ndarray:
+        if value not in self.categories:
+            return np.zeros(len(self.codes), dtype=bool)
+        return self.codes == self.categories.index(value)
+
+    def take(self, indices: np.ndarray) -> "CategoryColumn":
+        return CategoryColumn(self.codes[indices], self.categories)
+
+    @classmethod
+    def concat(cls, columns: Sequence["CategoryColumn"]) -> "CategoryColumn":
+        merged = cls.from_values([value for column in columns for value in column.categories])
+        lookup = {name: code for code, name in enumerate(merged.categories)}
+        codes = []
+        for column in columns:
+            remap = np.array([lookup[name] for name in column.categories] + [-1], dtype=np.int32)
+            # Index -1 picks the trailing -1 so missing values stay missing
+            codes.append(remap[column.codes])
+        return cls(np.concatenate(codes) if codes else np.zeros(0, dtype=np.int32), merged.categories)
+
+@dataclass(frozen=True)
+class LogBatch:
+    """ Columnar batch of Log records.
+
+    Filters such as failures(), grade_below() and graded_by() are NumPy masks over whole columns
+    instead of Python loops over dicts. has_grade records whether the "grade" key was present,
+    which is what marks a log as a failure.
+    """
+    id: StringColumn
+    question: StringColumn
+    docs: StringColumn  # JSON-encoded
+    answer: StringColumn
+    grade: np.ndarray  # float64, NaN where missing
+    has_grade: np.ndarray  # bool
+    grader: CategoryColumn
+    feedback: StringColumn
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        # Validates and serializes as a list of Log dicts, so graph input/output JSON schemas can be generated
+        from_logs = core_schema.no_info_after_validator_function(cls.from_logs, handler(List[Dict[str, Any]]))
+        return core_schema.json_or_python_schema(
+            json_schema=from_logs,
+            python_schema=core_schema.union_schema([core_schema.is_instance_schema(cls), from_logs]),
+            serialization=core_schema.plain_serializer_function_ser_schema(cls.to_logs),
+        )
+
+    @classmethod
+    def from_logs(cls, logs: Iterable[dict]) -> "LogBatch":
+        logs = list(logs)
+        return cls(
+            id=StringColumn.from_values([log["id"] for log in logs]),
+            question=StringColumn.from_values([log.get("question") for log in logs]),
+            docs=StringColumn.from_values([None if log.get("docs") is None else json.dumps(log["docs"]) for log in logs]),
+            answer=StringColumn.from_values([log.get("answer") for log in logs]),
+            grade=np.array([np.nan if log.get("grade") is None else log["grade"] for log in logs], dtype=np.float64),
+            has_grade=np.array(["grade" in log for log in logs], dtype=bool),
+            grader=CategoryColumn.from_values([log.get("grader") for log in logs]),
+            feedback=StringColumn.from_values([log.get("feedback") for log in logs]),
+        )
+
+    def to_logs(self) -> List[dict]:
+        columns = zip(self.id.to_list(), self.question.to_list(), self.docs.to_list(), self.answer.to_list(),
+                      self.grade.tolist(), self.has_grade.tolist(), self.grader.to_list(), self.feedback.to_list())
+        logs = []
+        for log_id, question, docs, answer, grade, has_grade, grader, feedback in columns:
+            log = {"id": log_id, "question": question, "docs": None if docs is None else json.loads(docs), "answer": answer}
+            if has_grade:
+                log["grade"] = None if np.isnan(grade) else int(grade)
+            if grader is not None:
+                log["grader"] = grader
+            if feedback is not None:
+                log["feedback"] = feedback
+            logs.append(log)
+        return logs
+
+    def __len__(self) -> int:
+        return len(self.has_grade)
+
+    def take(self, indices: np.ndarray) -> "LogBatch":
+        indices = np.asarray(indices, dtype=np.int64)
+        return LogBatch(self.id.take(indices), self.question.take(indices), self.docs.take(indices),
+                        self.answer.take(indices), self.grade[indices], self.has_grade[indices],
+                        self.grader.take(indices), self.feedback.take(indices))
+
+    def filter(self, mask: np.ndarray) -> "LogBatch":
+        return self.take(np.flatnonzero(mask))
+
+    @classmethod
+    def concat(cls, batches: Sequence["LogBatch"]) -> "LogBatch":
+        return cls(
+            id=StringColumn.concat([batch.id for batch in batches]),
+            question=StringColumn.concat([batch.question for batch in batches]),
+            docs=StringColumn.concat([batch.docs for batch in batches]),
+            answer=StringColumn.concat([batch.answer for batch in batches]),
+            grade=np.concatenate([batch.grade for batch in batches]),
+            has_grade=np.concatenate([batch.has_grade for batch in batches]),
+            grader=CategoryColumn.concat([batch.grader for batch in batches]),
+            feedback=StringColumn.concat([batch.feedback for batch in batches]),
+        )
+
+    # Vectorized masks
+
+    def failures(self) -> np.ndarray:
+        return self.has_grade.copy()
+
+    def grade_below(self, threshold: float) -> np.ndarray:
+        # NaN compares False, so logs without a grade never match
+        return self.grade < threshold
+
+    def graded_by(self, grader: str) -> np.ndarray:
+        return self.grader.equals(grader)
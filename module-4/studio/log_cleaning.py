@@ -0,0 +1,28 @@
+import re
+from dataclasses import replace
+from typing import Optional
+
+from log_batch import LogBatch, StringColumn
+
+_email = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_phone = re.compile(r"(?<!\w)\+?\d[\d\s().-]{7,}\d(?!\w)")
+_api_key = re.compile(r"\b(?:sk|lsv2|tvly)[-_][A-Za-z0-9_-]{16,}\b")
+_whitespace = re.compile(r"\s+")
+
+def scrub(text: Optional[str]) -> Optional[str]:
+    """ Normalise whitespace and mask emails, phone numbers and API keys """
+    if text is None:
+        return None
+    text = _api_key.sub("<API_KEY>", text)
+    text = _email.sub("<EMAIL>", text)
+    text = _phone.sub("<PHONE>", text)
+    return _whitespace.sub(" ", text).strip()
+
+def clean_batch(batch: LogBatch) -> LogBatch:
+    """ Scrub the free-text columns of a batch """
+    return replace(
+        batch,
+        question=StringColumn.from_values([scrub(value) for value in batch.question.to_list()]),
+        answer=StringColumn.from_values([scrub(value) for value in batch.answer.to_list()]),
+        feedback=StringColumn.from_values([scrub(value) for value in batch.feedback.to_list()]),
+    )
@@ -0,0 +1,223 @@
+import itertools
+import re
+from collections import Counter
+from typing import Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import merge_configs
+from langgraph.store.base import BaseStore
+from langgraph.store.memory import InMemoryStore
+
+import configuration
+from clustering import failure_features, grow_centers, minibatch_kmeans, nearest_center
+from log_batch import LogBatch
+from processed_set import ProcessedSet
+from shared_state import resolve
+from sub_graphs import Log, graph, summarize_clusters
+
+def iter_windows(logs: Iterable[Log], window_size: int) -> Iterator[List[Log]]:
+    """ Yield consecutive windows of at most window_size logs without materialising the whole input """
+    iterator = iter(logs)
+    while window := list(itertools.islice(iterator, window_size)):
+        yield window
+
+# Distinct reports kept across windows; the oldest are dropped beyond this
+MAX_REPORTS = 20
+
+def new_progress() -> dict:
+    return {"windows_done": 0, "logs_done": 0, "processed": None, "processed_count": 0,
+            "cluster_centers": [], "cluster_counts": [], "cluster_representatives": [], "fa_summary": None, "reports": []}
+
+def merge_window_result(progress: dict, result: dict, window_size: int, k: int) -> dict:
+    """ Fold one window's entry graph output into the running progress """
+    merged = dict(progress)
+    merged["windows_done"] = progress["windows_done"] + 1
+    merged["logs_done"] = progress["logs_done"] + window_size
+    # Processed ids are stored as runs, so the merged set stays small as windows accumulate
+    processed = ProcessedSet.from_dict(progress.get("processed")).merge(result.get("processed_logs"))
+    merged["processed"] = processed.to_dict()
+    merged["processed_count"] = len(processed)
+    # Failures only update k cluster centers, counts and representatives, so progress stays the same size
+    cleaned_logs = resolve(result["cleaned_logs"])
+    merge_cluster_counts(merged, cleaned_logs.filter(cleaned_logs.failures()), k)
+    merged["fa_summary"] = None
+    report = result.get("report")
+    if report and report not in progress["reports"]:
+        merged["reports"] = (progress["reports"] + [report])[-MAX_REPORTS:]
+    return merged
+
+def merged_clusters(progress: dict) -> List[dict]:
+    """ Clusters in the form cluster_failures returns, largest first """
+    clusters = [{"count": count, "representative": representative["log"]}
+                for count, representative in zip(progress["cluster_counts"], progress["cluster_representatives"])
+                if count and representative]
+    return sorted(clusters, key=lambda cluster: cluster["count"], reverse=True)
+
+def analyze_in_windows(
+    logs: Iterable[Log],
+    window_size: int = 1000,
+    store: Optional[BaseStore] = None,
+    run_id: str = "default",
+    config: Optional[RunnableConfig] = None,
+) -> dict:
+    """ Run the entry graph over logs one window at a time.
+
+    Only one window of logs is held in memory. Windows skip the failure summary model call; their
+    failures are folded into persisted clusters instead, and fa_summary is written once at the end
+    from those clusters. Progress is saved to the store under ("log_analysis", run_id) after every
+    window; calling again with the same store and run_id skips the logs that were already analyzed
+    and keeps merging into the saved results.
+    """
+    store = store if store is not None else InMemoryStore()
+    namespace = ("log_analysis", run_id)
+    item = store.get(namespace, "progress")
+    progress = {**new_progress(), **item.value} if item else new_progress()
+    configurable = configuration.Configuration.from_runnable_config(config)
+    window_config = merge_configs(config, {"configurable": {"summarize_failures": False}})
+
+    # Readers that support it jump straight to the first unprocessed record instead of parsing past it
+    if hasattr(logs, "iter_from"):
+        remaining = logs.iter_from(progress["logs_done"])
+    else:
+        remaining = itertools.islice(logs, progress["logs_done"], None)
+    for window in iter_windows(remaining, window_size):
+        result = graph.invoke({"raw_logs": window}, window_config)
+        progress = merge_window_result(progress, result, len(window), configurable.failure_clusters)
+        store.put(namespace, "progress", progress)
+
+    if progress["fa_summary"] is None and configurable.summarize_failures:
+        progress = {**progress, "fa_summary": summarize_clusters(merged_clusters(progress))}
+        store.put(namespace, "progress", progress)
+
+    return {
+        **progress,
+        "fa_summary": progress["fa_summary"] or "",
+        "report": "\n".join(progress["reports"]),
+    }
+
+# Incremental analysis
+
+# Words too common to say anything about what a question is about
+STOPWORDS = frozenset("a an and are can do does for how i in is it my of on or the to what when where which why with you".split())
+# Question-term histogram entries kept between runs
+MAX_QUESTION_TERMS = 1000
+
+_word = re.compile(r"[a-z][a-z0-9_]+")
+
+def new_aggregates() -> dict:
+    return {"logs": 0, "failures": 0, "failures_by_grader": {}, "question_terms": {},
+            "cluster_centers": [], "cluster_counts": [], "cluster_representatives": []}
+
+def merge_cluster_counts(aggregates: dict, failures: LogBatch, k: int) -> None:
+    """ Fold failures into the persisted clusters, seeding them with k-means on the first run.
+
+    Features skip IDF so centers stay comparable between runs, and each center moves to the running
+    mean of every failure assigned to it so far, which makes the aggregate mergeable. A first run
+    with fewer than k failures seeds fewer clusters; later runs add centers from their own failures
+    until there are k. Each cluster also keeps as its representative the failure seen so far that
+    is closest to its current center.
+    """
+    if not len(failures):
+        return
+    points = failure_features(failures, idf=False)
+    if aggregates["cluster_centers"]:
+        centers = grow_centers(points, np.array(aggregates["cluster_centers"], dtype=np.float32), k)
+        labels = nearest_center(points, centers)
+    else:
+        centers, labels = minibatch_kmeans(points, k)
+    counts = np.zeros(len(centers), dtype=np.int64)
+    counts[:len(aggregates["cluster_counts"])] = aggregates["cluster_counts"]
+    for center in np.unique(labels):
+        members = points[labels == center]
+        total = counts[center] + len(members)
+        centers[center] += (members.sum(axis=0) - len(members) * centers[center]) / total
+        counts[center] = total
+    aggregates["cluster_centers"] = centers.tolist()
+    aggregates["cluster_counts"] = counts.tolist()
+    aggregates["cluster_representatives"] = _closest_representatives(
+        aggregates.get("cluster_representatives", []), failures, points, labels, centers)
+
+def _closest_representatives(representatives: List[Optional[dict]], failures: LogBatch, points: np.ndarray,
+                             labels: np.ndarray, centers: np.ndarray) -> List[Optional[dict]]:
+    representatives = list(representatives) + [None] * (len(centers) - len(representatives))
+    # Centers moved, so the stored representatives are measured again against where they are now
+    kept = [i for i, representative in enumerate(representatives) if representative]
+    if kept:
+        features = failure_features(LogBatch.from_logs([representatives[i]["log"] for i in kept]), idf=False)
+        distances = ((features - centers[kept]) ** 2).sum(axis=1)
+    distance = {i: float(d) for i, d in zip(kept, distances)} if kept else {}
+    for center in np.unique(labels):
+        members = np.flatnonzero(labels == center)
+        member_distances = ((points[members] - centers[center]) ** 2).sum(axis=1)
+        best = int(np.argmin(member_distances))
+        if center not in distance or member_distances[best] < distance[center]:
+            representatives[center] = {"log": failures.take(members[best:best + 1]).to_logs()[0]}
+    return representatives
+
+def merge_aggregates(aggregates: dict, delta: LogBatch, k: int) -> dict:
+    """ Combine stored aggregates with the ones computed over a batch of new, already cleaned logs """
+    merged = {**aggregates, "failures_by_grader": dict(aggregates["failures_by_grader"])}
+    failures = delta.filter(delta.failures())
+    merged["logs"] += len(delta)
+    merged["failures"] += len(failures)
+
+    graders = np.bincount(failures.grader.codes[failures.grader.codes >= 0], minlength=len(failures.grader.categories))
+    for grader, count in zip(failures.grader.categories, graders.tolist()):
+        if count:
+            merged["failures_by_grader"][grader] = merged["failures_by_grader"].get(grader, 0) + count
+
+    terms = Counter(merged["question_terms"])
+    for question in delta.question.to_list():
+        terms.update(word for word in _word.findall((question or "").lower()) if word not in STOPWORDS)
+    merged["question_terms"] = dict(terms.most_common(MAX_QUESTION_TERMS))
+
+    merge_cluster_counts(merged, failures, k)
+    return merged
+
+def analyze_incremental(
+    logs: Union[LogBatch, Iterable[Log]],
+    store: BaseStore,
+    run_id: str = "default",
+    config: Optional[RunnableConfig] = None,
+) -> dict:
+    """ Analyze only the logs not seen by earlier runs and merge them into the stored aggregates.
+
+    The store keeps, under ("log_analysis", run_id), the set of ingested log ids (whose highest
+    integer id is the watermark) and aggregates that can be combined across runs: failures per
+    grader, failure clusters with counts and representatives, and a question-term histogram.
+    fa_summary is rewritten each run from the merged clusters, so it covers every ingested log,
+    and the distinct reports are kept and joined. Because ingested ids are tracked as a set of
+    runs rather than a single maximum, late-arriving logs below the watermark are still picked up. Work per run is proportional to the number of new logs.
+    """
+    namespace = ("log_analysis", run_id)
+    item = store.get(namespace, "incremental")
+    saved = item.value if item else {"ingested": None, "aggregates": new_aggregates(), "fa_summary": "", "reports": []}
+    ingested = ProcessedSet.from_dict(saved["ingested"])
+
+    batch = logs if isinstance(logs, LogBatch) else LogBatch.from_logs(logs)
+    ids = batch.id.to_list()
+    delta = batch.filter(~ingested.contains_many("ingested", ids))
+    if len(delta):
+        configurable = configuration.Configuration.from_runnable_config(config)
+        # As in analyze_in_windows, the delta's failures only update the stored clusters
+        result = graph.invoke({"raw_logs": delta}, merge_configs(config, {"configurable": {"summarize_failures": False}}))
+        ingested = ingested.merge(ProcessedSet.from_ids("ingested", delta.id.to_list()))
+        # Aggregates come from the graph's scrubbed copy, so no email or API key reaches the stored histogram
+        aggregates = merge_aggregates(saved["aggregates"], resolve(result["cleaned_logs"]), configurable.failure_clusters)
+        report = result.get("report")
+        saved = {
+            "ingested": ingested.to_dict(),
+            "aggregates": aggregates,
+            # One summary of every failure ingested so far, from the merged clusters
+            "fa_summary": summarize_clusters(merged_clusters(aggregates)) if configurable.summarize_failures else "",
+            "reports": (saved["reports"] + [report])[-MAX_REPORTS:] if report and report not in saved["reports"] else saved["reports"],
+        }
+        store.put(namespace, "incremental", saved)
+
+    return {
+        **saved,
+        "report": "\n".join(saved["reports"]),
+        "new_logs": len(delta),
+        "watermark": ingested.max_id("ingested"),
+    }
@@ -0,0 +1,108 @@
+import json
+import mmap
+import os
+from typing import Iterator, List, Optional, Union
+
+import numpy as np
+
+from sub_graphs import Log
+
+class JsonlLogReader:
+    """ Memory-mapped, lazily parsed view over a JSONL file of Log records.
+
+    Line spans are kept in a sidecar "<file>.idx.npy" (an (N, 2) array of start/end byte offsets)
+    that is built on first open and memory-mapped afterwards, so opening a large file is close to
+    instant. Records are only parsed when they are read. Lookups by id use a second sidecar,
+    "<file>.ids.json", built the first time get() is called.
+    """
+
+    # Newline scan chunk when building the index, so the scan never holds the whole file as an array
+    SCAN_CHUNK = 64 * 2**20
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = f"{path}.idx.npy"
+        self.ids_path = f"{path}.ids.json"
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.spans = self._load_or_build_spans()
+        self._positions: Optional[dict] = None
+
+    def __enter__(self) -> "JsonlLogReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def _is_fresh(self, sidecar: str) -> bool:
+        return os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(self.path)
+
+    def _load_or_build_spans(self) -> np.ndarray:
+        if self._is_fresh(self.index_path):
+            spans = np.load(self.index_path, mmap_mode="r")
+            if not len(spans) or spans[-1, 1] <= self.size:
+                return spans
+        spans = self._scan_spans()
+        np.save(self.index_path, spans)
+        return spans
+
+    def _scan_spans(self) -> np.ndarray:
+        """ Find every non-empty line by scanning for newlines chunk by chunk """
+        newlines = []
+        for start in range(0, self.size, self.SCAN_CHUNK):
+            chunk = np.frombuffer(self._mmap, dtype=np.uint8, count=min(self.SCAN_CHUNK, self.size - start), offset=start)
+            newlines.append(np.flatnonzero(chunk == ord("\n")) + start)
+            del chunk
+        ends = np.concatenate(newlines + [np.array([self.size], dtype=np.int64)]).astype(np.int64)
+        starts = np.concatenate([[0], ends[:-1] + 1]).astype(np.int64)
+        spans = np.stack([starts, ends], axis=1)
+        # Drop blank lines, including a trailing newline at the end of the file
+        return np.ascontiguousarray(spans[spans[:, 1] - spans[:, 0] > 0])
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def _parse(self, position: int) -> Log:
+        start, end = self.spans[position]
+        return json.loads(self._mmap[start:end])
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Log, List[Log]]:
+        if isinstance(key, slice):
+            return [self._parse(position) for position in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("log index out of range")
+        return self._parse(key)
+
+    def __iter__(self) -> Iterator[Log]:
+        return self.iter_from(0)
+
+    def iter_from(self, start: int) -> Iterator[Log]:
+        """ Parse records lazily from position start onwards """
+        for position in range(start, len(self)):
+            yield self._parse(position)
+
+    def get(self, log_id: str) -> Optional[Log]:
+        """ Random access by Log id """
+        if self._positions is None:
+            self._positions = self._load_or_build_ids()
+        position = self._positions.get(log_id)
+        return None if position is None else self._parse(position)
+
+    def _load_or_build_ids(self) -> dict:
+        if self._is_fresh(self.ids_path) and self._is_fresh(self.index_path):
+            with open(self.ids_path) as f:
+                ids = json.load(f)
+            if len(ids) == len(self):
+                return {log_id: position for position, log_id in enumerate(ids)}
+        ids = [self._parse(position)["id"] for position in range(len(self))]
+        with open(self.ids_path, "w") as f:
+            json.dump(ids, f)
+        return {log_id: position for position, log_id in enumerate(ids)}
@@ -1,17 +1,31 @@
+import functools
 import operator
 from typing import Annotated
 from typing_extensions import TypedDict
 
 from pydantic import BaseModel
 
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langchain_openai import ChatOpenAI 
 
 from langgraph.constants import Send
 from langgraph.graph import END, StateGraph, START
 
+import configuration
+from batching import AdaptiveBatcher, run_adaptive_batches
+from dedup import NearDuplicateIndex, group_near_duplicates
+from fanout import chunked_sends
+from incremental_json import JsonStringListParser
+from tournament import tournament_reduce
+
 # Prompts we will use
 subjects_prompt = """Generate a list of 3 sub-topics that are all related to this overall topic: {topic}."""
 joke_prompt = """Generate a joke about {subject}"""
+jokes_prompt = """Generate one joke for each of the subjects below. Return exactly {n} jokes, in the same order as the subjects.
+
+{subjects}"""
+rate_joke_prompt = """Rate how funny this joke is on a scale from 1 to 10. Joke: \n\n  {joke}"""
 best_joke_prompt = """Below are a bunch of jokes about {topic}. Select the best one! Return the ID of the best one, starting 0 as the ID for the first joke. Jokes: \n\n  {jokes}"""
 
 # LLM
@@ -23,46 +37,170 @@ class Subjects(BaseModel):
 
 class BestJoke(BaseModel):
     id: int
+
+class JokeRating(BaseModel):
+    score: int
+
+def keep_best(left: dict, right: dict) -> dict:
+    """ Fold a newly scored joke into the running best, keeping the earlier one on ties """
+    if not left:
+        return right
+    if not right:
+        return left
+    return right if right["score"] > left["score"] else left
     
 class OverallState(TypedDict):
     topic: str
     subjects: list
     jokes: Annotated[list, operator.add]
+    # Running best for reduce_mode="streaming"; each map branch's update carries its own candidate,
+    # so the best-so-far can be read from stream_mode="updates" before every branch has finished
+    best_so_far: Annotated[dict, keep_best]
+    # Joke for every original subject, including near-duplicates that shared a branch
+    joke_by_subject: Annotated[dict, operator.or_]
     best_selected_joke: str
 
-def generate_topics(state: OverallState):
+def generate_topics(state: OverallState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
     prompt = subjects_prompt.format(topic=state["topic"])
+    if configurable.map_mode == "pipelined":
+        return generate_topics_pipelined(prompt, configurable)
     response = model.with_structured_output(Subjects).invoke(prompt)
     return {"subjects": response.subjects}
 
 class JokeState(TypedDict):
     subject: str
+    aliases: list
 
 class Joke(BaseModel):
     joke: str
 
-def generate_joke(state: JokeState):
-    prompt = joke_prompt.format(subject=state["subject"])
+def write_joke(subject: str) -> str:
+    prompt = joke_prompt.format(subject=subject)
     response = model.with_structured_output(Joke).invoke(prompt)
-    return {"jokes": [response.joke]}
+    return response.joke
+
+def score_jokes(jokes: list[str], max_concurrency: int) -> list[int]:
+    """ Rate each joke independently so ratings can be folded in any order """
+    prompts = [rate_joke_prompt.format(joke=joke) for joke in jokes]
+    responses = model.with_structured_output(JokeRating).batch(prompts, config={"max_concurrency": max_concurrency})
+    return [response.score for response in responses]
+
+def joke_updates(subject_groups: list[list[str]], jokes: list[str], configurable: configuration.Configuration) -> dict:
+    """ State update for a set of finished jokes, one per subject group, including the running best when streaming """
+    update = {
+        "jokes": jokes,
+        # Fan each joke back out to every subject that was merged into its group
+        "joke_by_subject": {subject: joke for group, joke in zip(subject_groups, jokes) for subject in group},
+    }
+    if configurable.reduce_mode == "streaming" and jokes:
+        scores = score_jokes(jokes, configurable.max_concurrency)
+        candidates = [{"joke": joke, "score": score} for joke, score in zip(jokes, scores)]
+        update["best_so_far"] = functools.reduce(keep_best, candidates)
+    return update
+
+def generate_joke(state: JokeState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
+    subjects = state.get("aliases") or [state["subject"]]
+    return joke_updates([subjects], [write_joke(state["subject"])], configurable)
+
+class JokeBatchState(TypedDict):
+    subject_groups: list
+
+class Jokes(BaseModel):
+    jokes: list[str]
+
+def write_jokes(subjects: list[str]) -> list[str]:
+    """ One structured call for a whole batch of subjects """
+    if len(subjects) == 1:
+        return [write_joke(subjects[0])]
+    numbered = "\n".join(f"{i + 1}. {s}" for i, s in enumerate(subjects))
+    prompt = jokes_prompt.format(n=len(subjects), subjects=numbered)
+    response = model.with_structured_output(Jokes).invoke(prompt)
+    # A short or padded answer can't be matched back to subjects, so let the batcher retry smaller
+    if len(response.jokes) != len(subjects):
+        raise ValueError(f"Expected {len(subjects)} jokes, got {len(response.jokes)}")
+    return response.jokes
+
+def generate_jokes_batched(state: JokeBatchState, config: RunnableConfig):
+    """ Map over subjects in adaptive batches, writing to the same jokes reducer as generate_joke """
+    configurable = configuration.Configuration.from_runnable_config(config)
+    batcher = AdaptiveBatcher(min_size=configurable.min_batch_size,
+                              max_size=configurable.max_batch_size,
+                              initial_size=configurable.initial_batch_size,
+                              target_latency=configurable.target_batch_latency)
+    subject_groups = state["subject_groups"]
+    jokes = run_adaptive_batches([group[0] for group in subject_groups], write_jokes, batcher, configurable.max_concurrency)
+    return joke_updates(subject_groups, jokes, configurable)
+
+def pick_best_jokes(topic: str, groups: list[list[str]], max_concurrency: int) -> list[int]:
+    """ Run one best-joke selection per group in parallel """
+    prompts = [best_joke_prompt.format(topic=topic, jokes="\n\n".join(group)) for group in groups]
+    responses = model.with_structured_output(BestJoke).batch(prompts, config={"max_concurrency": max_concurrency})
+    return [response.id for response in responses]
+
+def generate_topics_pipelined(prompt: str, configurable: configuration.Configuration):
+    """ Stream the Subjects tool call and start a joke for each subject as soon as it is complete """
+    parser = JsonStringListParser("subjects")
+    index = NearDuplicateIndex(configurable.dedup_threshold) if configurable.dedup_threshold > 0 else None
+    subjects = []
+    subject_groups = []
+    futures = []
+    # ContextThreadPoolExecutor carries the node's config context, so joke calls stay in traces and message streams
+    with ContextThreadPoolExecutor(max_workers=max(1, configurable.max_concurrency)) as executor:
+        for chunk in model.bind_tools([Subjects], tool_choice="Subjects").stream(prompt):
+            for tool_call_chunk in chunk.tool_call_chunks:
+                for subject in parser.feed(tool_call_chunk.get("args") or ""):
+                    subjects.append(subject)
+                    position = index.add(subject) if index else len(subject_groups)
+                    if position < len(subject_groups):
+                        subject_groups[position].append(subject)
+                        continue
+                    subject_groups.append([subject])
+                    futures.append(executor.submit(write_joke, subject))
+        jokes = [future.result() for future in futures]
+    return {"subjects": subjects, **joke_updates(subject_groups, jokes, configurable)}
+
+def best_joke(state: OverallState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
+    if configurable.reduce_mode == "tournament":
+        winner = tournament_reduce(
+            state["jokes"],
+            lambda groups: pick_best_jokes(state["topic"], groups, configurable.max_concurrency),
+            configurable.tournament_group_size,
+        )
+        return {"best_selected_joke": state["jokes"][winner]}
+
+    if configurable.reduce_mode == "streaming" and state.get("best_so_far"):
+        # Every branch already folded its joke in, so there is nothing left to compare
+        return {"best_selected_joke": state["best_so_far"]["joke"]}
 
-def best_joke(state: OverallState):
     jokes = "\n\n".join(state["jokes"])
     prompt = best_joke_prompt.format(topic=state["topic"], jokes=jokes)
     response = model.with_structured_output(BestJoke).invoke(prompt)
     return {"best_selected_joke": state["jokes"][response.id]}
 
-def continue_to_jokes(state: OverallState):
-    return [Send("generate_joke", {"subject": s}) for s in state["subjects"]]
+def continue_to_jokes(state: OverallState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
+    if configurable.map_mode == "pipelined":
+        # generate_topics already wrote the jokes while it streamed the subjects
+        return "best_joke"
+    # Near-duplicate subjects share one branch, led by the first subject of each group
+    subject_groups = group_near_duplicates(state["subjects"], configurable.dedup_threshold)
+    if configurable.map_mode == "batch":
+        return chunked_sends("generate_jokes_batched", subject_groups, configurable.send_chunk_size, "subject_groups")
+    return [Send("generate_joke", {"subject": group[0], "aliases": group}) for group in subject_groups]
 
 # Construct the graph: here we put everything together to construct our graph
-graph_builder = StateGraph(OverallState)
+graph_builder = StateGraph(OverallState, config_schema=configuration.Configuration)
 graph_builder.add_node("generate_topics", generate_topics)
 graph_builder.add_node("generate_joke", generate_joke)
+graph_builder.add_node("generate_jokes_batched", generate_jokes_batched)
 graph_builder.add_node("best_joke", best_joke)
 graph_builder.add_edge(START, "generate_topics")
-graph_builder.add_conditional_edges("generate_topics", continue_to_jokes, ["generate_joke"])
+graph_builder.add_conditional_edges("generate_topics", continue_to_jokes, ["generate_joke", "generate_jokes_batched", "best_joke"])
 graph_builder.add_edge("generate_joke", "best_joke")
+graph_builder.add_edge("generate_jokes_batched", "best_joke")
 graph_builder.add_edge("best_joke", END)
 
 # Compile the graph
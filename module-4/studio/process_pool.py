@@ -0,0 +1,81 @@
+import dataclasses
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, List
+
+import numpy as np
+
+@dataclasses.dataclass(frozen=True)
+class _ArraySlot:
+    """ Where one array lives in the shared block """
+    offset: int
+    dtype: str
+    shape: tuple
+
+@dataclasses.dataclass(frozen=True)
+class _DataclassSlot:
+    cls: type
+    fields: dict
+
+def _layout(value: Any, arrays: List[np.ndarray], offset: List[int]) -> Any:
+    """ Replace the arrays inside a (nested) dataclass with slots pointing into one contiguous block """
+    if isinstance(value, np.ndarray):
+        arrays.append(np.ascontiguousarray(value))
+        slot = _ArraySlot(offset[0], value.dtype.str, value.shape)
+        # Keep every array 8-byte aligned inside the block
+        offset[0] += -(-value.nbytes // 8) * 8
+        return slot
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return _DataclassSlot(type(value), {f.name: _layout(getattr(value, f.name), arrays, offset) for f in dataclasses.fields(value)})
+    return value
+
+def _restore(layout: Any, buffer: memoryview) -> Any:
+    if isinstance(layout, _ArraySlot):
+        return np.ndarray(layout.shape, dtype=np.dtype(layout.dtype), buffer=buffer, offset=layout.offset)
+    if isinstance(layout, _DataclassSlot):
+        return layout.cls(**{name: _restore(field, buffer) for name, field in layout.fields.items()})
+    return layout
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        # Workers only borrow the block; the parent owns and unlinks it
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+def _run_chunk(fn: Callable, name: str, layout: Any, start: int, stop: int) -> Any:
+    block = _attach(name)
+    try:
+        batch = _restore(layout, block.buf)
+        # take() copies just this chunk's rows out of shared memory
+        chunk = batch.take(np.arange(start, stop))
+        del batch
+        return fn(chunk)
+    finally:
+        block.close()
+
+def map_in_processes(fn: Callable, batch: Any, max_workers: int, chunk_size: int) -> Any:
+    """ Apply fn to row chunks of batch in a process pool and concatenate the results in order.
+
+    batch is any dataclass of NumPy arrays with take(), len() and a concat() classmethod, such as
+    LogBatch. Its arrays are copied once into a single shared-memory block; workers receive only
+    the block name and a small layout description instead of a pickled copy of their rows. fn must
+    be a module-level function so it can be sent to the workers.
+    """
+    arrays: List[np.ndarray] = []
+    offset = [0]
+    layout = _layout(batch, arrays, offset)
+    block = shared_memory.SharedMemory(create=True, size=max(offset[0], 1))
+    try:
+        position = 0
+        for array in arrays:
+            block.buf[position:position + array.nbytes] = array.view(np.uint8).reshape(-1)
+            position += -(-array.nbytes // 8) * 8
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_run_chunk, fn, block.name, layout, start, min(start + chunk_size, len(batch)))
+                       for start in range(0, len(batch), chunk_size)]
+            results = [future.result() for future in futures]
+    finally:
+        block.close()
+        block.unlink()
+    return type(batch).concat(results) if results else batch
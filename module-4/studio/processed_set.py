@@ -0,0 +1,165 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import core_schema
+
+def _coalesce(runs: np.ndarray) -> np.ndarray:
+    """ Sort half-open [start, end) runs and merge the ones that overlap or touch """
+    if len(runs) == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    runs = runs[np.argsort(runs[:, 0], kind="stable")]
+    reach = np.maximum.accumulate(runs[:, 1])
+    heads = np.concatenate([[0], np.flatnonzero(runs[1:, 0] > reach[:-1]) + 1])
+    tails = np.concatenate([heads[1:] - 1, [len(runs) - 1]])
+    return np.stack([runs[heads, 0], reach[tails]], axis=1).astype(np.int64)
+
+def _runs_from_values(values: np.ndarray) -> np.ndarray:
+    values = np.unique(values)
+    if len(values) == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    breaks = np.flatnonzero(np.diff(values) != 1) + 1
+    heads = np.concatenate([[0], breaks])
+    tails = np.concatenate([breaks - 1, [len(values) - 1]])
+    return np.stack([values[heads], values[tails] + 1], axis=1).astype(np.int64)
+
+# Ids that are the decimal form of their own integer. "007", "+8" or "-0" are different ids from
+# "7", "8" and "0", so they must not share a value in the runs. 18 digits stay inside int64.
+_canonical = re.compile(r"-?[1-9][0-9]{0,17}|0")
+
+def _numeric_ids(ids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """ Mask of the ids stored as integers, and their values (0 where the mask is False) """
+    strings = np.array(ids, dtype=str) if ids else np.zeros(0, dtype=str)
+    try:
+        values = strings.astype(np.int64)
+    except (ValueError, OverflowError):
+        numeric = np.fromiter((_canonical.fullmatch(log_id) is not None for log_id in ids), dtype=bool, count=len(ids))
+        values = np.zeros(len(ids), dtype=np.int64)
+        values[numeric] = strings[numeric].astype(np.int64)
+        return numeric, values
+    # Every id parsed, so only the round trip can tell "007" from "7"
+    numeric = values.astype(str) == strings
+    return numeric, np.where(numeric, values, 0)
+
+@dataclass(frozen=True)
+class ProcessedSet:
+    """ Set of processed log ids per stage, e.g. "failure-analysis" or "summary".
+
+    Integer ids are kept as sorted, coalesced [start, end) runs, so a contiguous block of a million
+    ids costs one run. Ids that are not integers fall back to a sorted list per stage.
+    """
+    runs: Dict[str, np.ndarray] = field(default_factory=dict)
+    extra: Dict[str, List[str]] = field(default_factory=dict)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        # Validates and serializes as the to_dict() form, so graph input/output JSON schemas can be generated
+        from_dict = core_schema.no_info_after_validator_function(
+            cls.from_dict, handler(Dict[str, Dict[str, List[Any]]]))
+        return core_schema.json_or_python_schema(
+            json_schema=from_dict,
+            python_schema=core_schema.union_schema([core_schema.is_instance_schema(cls), from_dict]),
+            serialization=core_schema.plain_serializer_function_ser_schema(cls.to_dict),
+        )
+
+    @classmethod
+    def from_ids(cls, stage: str, ids: Iterable[str]) -> "ProcessedSet":
+        ids = list(ids)
+        numeric, values = _numeric_ids(ids)
+        extra = sorted({log_id for log_id, ok in zip(ids, numeric.tolist()) if not ok})
+        values = values[numeric]
+        return cls({stage: _runs_from_values(values)}, {stage: extra} if extra else {})
+
+    def merge(self, other: Optional["ProcessedSet"]) -> "ProcessedSet":
+        if not other:
+            return self
+        if not self:
+            return other
+        runs = dict(self.runs)
+        for stage, stage_runs in other.runs.items():
+            runs[stage] = _coalesce(np.concatenate([runs[stage], stage_runs])) if stage in runs else stage_runs
+        extra = dict(self.extra)
+        for stage, ids in other.extra.items():
+            extra[stage] = sorted(set(extra.get(stage, [])) | set(ids))
+        return ProcessedSet(runs, extra)
+
+    def contains(self, stage: str, log_id: str) -> bool:
+        if log_id in self.extra.get(stage, ()):
+            return True
+        stage_runs = self.runs.get(stage)
+        if stage_runs is None or not len(stage_runs) or not _canonical.fullmatch(log_id):
+            return False
+        value = int(log_id)
+        position = np.searchsorted(stage_runs[:, 0], value, side="right") - 1
+        return bool(position >= 0 and value < stage_runs[position, 1])
+
+    def contains_many(self, stage: str, ids: Sequence[str]) -> np.ndarray:
+        """ Vectorized contains() over many ids """
+        ids = list(ids)
+        found = np.zeros(len(ids), dtype=bool)
+        extra = set(self.extra.get(stage, ()))
+        if extra:
+            found |= np.fromiter((log_id in extra for log_id in ids), dtype=bool, count=len(ids))
+        stage_runs = self.runs.get(stage)
+        if stage_runs is None or not len(stage_runs):
+            return found
+        numeric, values = _numeric_ids(ids)
+        positions = np.searchsorted(stage_runs[:, 0], values, side="right") - 1
+        inside = (positions >= 0) & (values < stage_runs[np.maximum(positions, 0), 1])
+        return found | (numeric & inside)
+
+    def max_id(self, stage: str) -> Optional[int]:
+        """ Highest integer id processed for stage, i.e. its high-water mark """
+        stage_runs = self.runs.get(stage)
+        return int(stage_runs[-1, 1]) - 1 if stage_runs is not None and len(stage_runs) else None
+
+    def count(self, stage: Optional[str] = None) -> int:
+        stages = [stage] if stage else set(self.runs) | set(self.extra)
+        total = 0
+        for name in stages:
+            if name in self.runs:
+                total += int((self.runs[name][:, 1] - self.runs[name][:, 0]).sum())
+            total += len(self.extra.get(name, ()))
+        return total
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def to_dict(self) -> dict:
+        """ JSON-friendly form, for stores that only accept JSON values """
+        return {"runs": {stage: runs.tolist() for stage, runs in self.runs.items()}, "extra": self.extra}
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "ProcessedSet":
+        if not data:
+            return cls()
+        runs = {stage: np.array(stage_runs, dtype=np.int64).reshape(-1, 2) for stage, stage_runs in data["runs"].items()}
+        return cls(runs, dict(data.get("extra", {})))
+
+    def to_bytes(self) -> bytes:
+        """ Compact form: a JSON header with the stage layout followed by the raw little-endian runs """
+        header = {"stages": [[stage, len(runs)] for stage, runs in self.runs.items()], "extra": self.extra}
+        header_bytes = json.dumps(header).encode()
+        body = b"".join(runs.astype("<i8").tobytes() for runs in self.runs.values())
+        return len(header_bytes).to_bytes(4, "little") + header_bytes + body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ProcessedSet":
+        size = int.from_bytes(data[:4], "little")
+        header = json.loads(data[4:4 + size])
+        body = np.frombuffer(data, dtype="<i8", offset=4 + size)
+        runs, position = {}, 0
+        for stage, count in header["stages"]:
+            runs[stage] = body[position:position + 2 * count].reshape(-1, 2).astype(np.int64)
+            position += 2 * count
+        return cls(runs, header["extra"])
+
+def merge_processed(left: Optional[ProcessedSet], right: Optional[ProcessedSet]) -> ProcessedSet:
+    """ Reducer for processed_logs channels """
+    return (left or ProcessedSet()).merge(right)
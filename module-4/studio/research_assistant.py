@@ -6,11 +6,15 @@ from typing_extensions import TypedDict
 from langchain_community.document_loaders import WikipediaLoader
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, get_buffer_string
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 
 from langgraph.constants import Send
 from langgraph.graph import END, MessagesState, START, StateGraph
 
+import configuration
+from dedup import group_near_duplicates
+
 ### LLM
 
 llm = ChatOpenAI(model="gpt-4o", temperature=0) 
@@ -50,7 +54,9 @@ class InterviewState(MessagesState):
     context: Annotated[list, operator.add] # Source docs
     analyst: Analyst # Analyst asking questions
     interview: str # Interview transcript
+    merged_analysts: List[str] # Names of the analysts this interview stands in for, including its own
     sections: list # Final key we duplicate in outer state for Send() API
+    section_by_analyst: dict # Also duplicated in outer state
 
 class SearchQuery(BaseModel):
     search_query: str = Field(None, description="Search query for retrieval.")
@@ -61,6 +67,8 @@ class ResearchGraphState(TypedDict):
     human_analyst_feedback: str # Human feedback
     analysts: List[Analyst] # Analyst asking questions
     sections: Annotated[list, operator.add] # Send() API key
+    # Section for every original analyst, including near-duplicates that shared an interview
+    section_by_analyst: Annotated[dict, operator.or_]
     introduction: str # Introduction for the final report
     content: str # Content for the final report
     conclusion: str # Conclusion for the final report
@@ -352,8 +360,9 @@ def write_section(state: InterviewState):
     system_message = section_writer_instructions.format(focus=analyst.description)
     section = llm.invoke([SystemMessage(content=system_message)]+[HumanMessage(content=f"Use this source to write your section: {context}")]) 
                 
-    # Append it to state
-    return {"sections": [section.content]}
+    # Append it to state, and fan it back out to every analyst merged into this interview
+    return {"sections": [section.content],
+            "section_by_analyst": {name: section.content for name in state.get("merged_analysts") or [analyst.name]}}
 
 # Add nodes and edges 
 interview_builder = StateGraph(InterviewState)
@@ -374,7 +383,7 @@ interview_builder.add_conditional_edges("answer_question", route_messages,['ask_
 interview_builder.add_edge("save_interview", "write_section")
 interview_builder.add_edge("write_section", END)
 
-def initiate_all_interviews(state: ResearchGraphState):
+def initiate_all_interviews(state: ResearchGraphState, config: RunnableConfig):
 
     """ Conditional edge to initiate all interviews via Send() API or return to create_analysts """    
 
@@ -387,11 +396,16 @@ def initiate_all_interviews(state: ResearchGraphState):
     # Otherwise kick off interviews in parallel via Send() API
     else:
         topic = state["topic"]
-        return [Send("conduct_interview", {"analyst": analyst,
+        # Analysts with near-identical focus would run the same interview, so only the first of each group is sent
+        configurable = configuration.ResearchConfiguration.from_runnable_config(config)
+        analyst_groups = group_near_duplicates(state["analysts"], configurable.dedup_threshold,
+                                               key=lambda analyst: f"{analyst.role} {analyst.description}")
+        return [Send("conduct_interview", {"analyst": group[0],
+                                           "merged_analysts": [analyst.name for analyst in group],
                                            "messages": [HumanMessage(
                                                content=f"So you said you were writing an article on {topic}?"
                                            )
-                                                       ]}) for analyst in state["analysts"]]
+                                                       ]}) for group in analyst_groups]
 
 # Write a report based on the interviews
 report_writer_instructions = """You are a technical writer creating a report on this overall topic: 
@@ -523,7 +537,7 @@ def finalize_report(state: ResearchGraphState):
     return {"final_report": final_report}
 
 # Add nodes and edges 
-builder = StateGraph(ResearchGraphState)
+builder = StateGraph(ResearchGraphState, config_schema=configuration.ResearchConfiguration)
 builder.add_node("create_analysts", create_analysts)
 builder.add_node("human_feedback", human_feedback)
 builder.add_node("conduct_interview", interview_builder.compile())
@@ -0,0 +1,233 @@
+import base64
+import dataclasses
+import hashlib
+import os
+import stat
+import tempfile
+import time
+import uuid
+import weakref
+from dataclasses import dataclass
+from datetime import timezone
+from typing import Any, Iterator, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.store.base import BaseStore
+
+from checkpoint_serde import checkpoint_serde
+
+class _Blob:
+    """ Holder so values that can't be weakly referenced (lists, dicts) can still live in the registry """
+    __slots__ = ("value", "__weakref__")
+
+    def __init__(self, value: Any):
+        self.value = value
+
+# Blobs stay registered for as long as some SharedRef in this process still points at them
+_registry: "weakref.WeakValueDictionary[str, _Blob]" = weakref.WeakValueDictionary()
+
+# Namespace for shared values kept in a LangGraph store
+BLOB_NAMESPACE = ("shared_state",)
+
+# Config key LangGraph sets when the graph runs with a checkpointer (langgraph.constants.CONFIG_KEY_CHECKPOINTER)
+_CHECKPOINTER_KEY = "__pregel_checkpointer"
+
+# Values are persisted with the checkpoint serializer rather than pickle, so loading a blob can only
+# rebuild LangGraph's safe types and the ones checkpoint_serde registers, never run code
+_serde = checkpoint_serde()
+
+def _default_directory() -> str:
+    user = os.getuid() if hasattr(os, "getuid") else os.getlogin()
+    return os.path.join(tempfile.gettempdir(), f"langgraph_shared_blobs-{user}")
+
+def _private_directory() -> str:
+    """ Per-user blob directory under the temp dir, refused unless it is ours and closed to others """
+    directory = _default_directory()
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or (hasattr(os, "getuid") and info.st_uid != os.getuid()) or info.st_mode & 0o077:
+        raise PermissionError(f"{directory} is not a private directory owned by this user; set SHARED_BLOB_DIR instead")
+    return directory
+
+class FileBlobStore:
+    """ Content-addressed blobs as files, used when the graph has a checkpointer but no LangGraph store.
+
+    The directory is $SHARED_BLOB_DIR, which workers that should resolve each other's handles must
+    point at the same volume, or else a private (0700) per-user directory under the temp dir.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+
+    @property
+    def directory(self) -> str:
+        # Resolved on first use, so importing this module creates nothing on disk
+        if self._directory is None:
+            self._directory = os.environ.get("SHARED_BLOB_DIR") or _private_directory()
+        return self._directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        # Content-addressed, so an existing file already holds these bytes; touch it to restart its grace period
+        if os.path.exists(path):
+            os.utime(path)
+            return
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def items(self) -> Iterator[Tuple[str, float]]:
+        """ (key, last modified) for every blob, including temp files left by an interrupted put """
+        # Don't create the private directory just to find it empty
+        if self._directory is None and not os.environ.get("SHARED_BLOB_DIR") and not os.path.isdir(_default_directory()):
+            return
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    yield entry.name, entry.stat(follow_symlinks=False).st_mtime
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+blob_store = FileBlobStore()
+
+def _encode(value: Any) -> bytes:
+    type_, data = _serde.dumps_typed(value)
+    return type_.encode() + b"\n" + data
+
+def _decode(blob: bytes) -> Any:
+    type_, _, data = blob.partition(b"\n")
+    return _serde.loads_typed((type_.decode(), data))
+
+def _persist(key: str, data: bytes, store: Optional[BaseStore]) -> None:
+    if store is not None:
+        store.put(BLOB_NAMESPACE, key, {"data": base64.b64encode(data).decode()})
+    else:
+        blob_store.put(key, data)
+
+def _load(key: str, store: Optional[BaseStore]) -> Optional[bytes]:
+    if store is not None:
+        item = store.get(BLOB_NAMESPACE, key)
+        if item is not None:
+            return base64.b64decode(item.value["data"])
+    return blob_store.get(key)
+
+@dataclass(frozen=True)
+class SharedRef:
+    """ Handle to an immutable state value shared by reference.
+
+    Only the key, a hash of the value's serialized bytes, is a dataclass field, so checkpointers
+    serialize a few bytes instead of the value, and every branch or subgraph that receives the
+    handle reads the same object without copying it. When the graph runs with a checkpointer the
+    bytes are also written once to a blob store (the graph's LangGraph store when it has one,
+    otherwise files), so a handle read back from a checkpoint in another process, after a restart
+    or when replaying history loads the value from there. collect_garbage deletes blobs that no
+    checkpoint refers to any more.
+    """
+    key: str
+
+    def __post_init__(self):
+        object.__setattr__(self, "_blob", _registry.get(self.key))
+
+    def get(self, store: Optional[BaseStore] = None) -> Any:
+        if self._blob is None:
+            blob = _registry.get(self.key)
+            if blob is None:
+                data = _load(self.key, store)
+                if data is None:
+                    raise LookupError(f"Shared value {self.key} is not in this process or the blob store")
+                blob = _Blob(freeze(_decode(data)))
+                _registry[self.key] = blob
+            # Keep the loaded value alive for as long as this handle is
+            object.__setattr__(self, "_blob", blob)
+        return self._blob.value
+
+def freeze(value: Any) -> Any:
+    """ Make the NumPy buffers inside value read-only, recursing into dataclass fields """
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+        for f in dataclasses.fields(value):
+            freeze(getattr(value, f.name))
+    return value
+
+def share(value: Any, store: Optional[BaseStore] = None, config: Optional[RunnableConfig] = None) -> SharedRef:
+    """ Freeze and register value, returning a handle to put in state instead of the value.
+
+    The value is persisted, under a hash of its bytes, only if config shows the graph runs with a
+    checkpointer. Without one no checkpoint can outlive this process, so the in-process registry is
+    enough and the value isn't even serialized.
+    """
+    if config and (config.get("configurable") or {}).get(_CHECKPOINTER_KEY) is not None:
+        data = _encode(value)
+        key = hashlib.sha256(data).hexdigest()
+        _persist(key, data, store)
+    else:
+        key = uuid.uuid4().hex
+    blob = _registry.get(key) or _Blob(freeze(value))
+    _registry[key] = blob
+    return SharedRef(key)
+
+def resolve(value: Any, store: Optional[BaseStore] = None) -> Any:
+    """ Return the shared value behind a SharedRef, or value itself if it isn't one """
+    return value.get(store) if isinstance(value, SharedRef) else value
+
+def _referenced_keys(value: Any, keys: Set[str]) -> None:
+    if isinstance(value, SharedRef):
+        keys.add(value.key)
+    elif isinstance(value, dict):
+        # Under strict msgpack without checkpoint_serde a SharedRef loads as {"key": ...}; keep those too
+        if set(value) == {"key"} and isinstance(value["key"], str):
+            keys.add(value["key"])
+        for item in value.values():
+            _referenced_keys(item, keys)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _referenced_keys(item, keys)
+
+def collect_garbage(checkpointer: BaseCheckpointSaver, store: Optional[BaseStore] = None,
+                    grace_seconds: float = 3600.0) -> int:
+    """ Delete persisted blobs that no checkpoint or pending write refers to, returning how many.
+
+    Run it after pruning checkpoints, e.g. alongside checkpoint retention. Blobs written or touched
+    in the last grace_seconds are kept, since a run may have shared a value whose checkpoint is not
+    written yet.
+    """
+    referenced: Set[str] = set()
+    for checkpoint_tuple in checkpointer.list(None):
+        _referenced_keys(checkpoint_tuple.checkpoint.get("channel_values"), referenced)
+        _referenced_keys([value for _, _, value in checkpoint_tuple.pending_writes or ()], referenced)
+
+    cutoff = time.time() - grace_seconds
+    deleted = 0
+    if store is not None:
+        stale, offset = [], 0
+        while page := store.search(BLOB_NAMESPACE, limit=100, offset=offset):
+            stale += [item.key for item in page if item.key not in referenced
+                      and item.updated_at.replace(tzinfo=item.updated_at.tzinfo or timezone.utc).timestamp() < cutoff]
+            offset += len(page)
+        for key in stale:
+            store.delete(BLOB_NAMESPACE, key)
+        deleted += len(stale)
+    for key, modified in list(blob_store.items()):
+        if key not in referenced and modified < cutoff:
+            blob_store.delete(key)
+            deleted += 1
+    return deleted
@@ -1,7 +1,25 @@
-from operator import add
 from typing import List, Optional, Annotated
 from typing_extensions import TypedDict
+from langchain_core.runnables import RunnableConfig
+from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, START, END
+from langgraph.store.base import BaseStore
+
+import configuration
+from clustering import cluster_failures
+from log_batch import LogBatch
+from log_cleaning import clean_batch
+from process_pool import map_in_processes
+from processed_set import ProcessedSet, merge_processed
+from shared_state import SharedRef, resolve, share
+
+llm = ChatOpenAI(model="gpt-4o", temperature=0) 
+
+failure_summary_prompt = """Below are clusters of failed question-answering logs. Each cluster shows how many failures it contains and the failure closest to its center.
+
+Summarize the main failure modes in a few sentences, most common first.
+
+{clusters}"""
 
 # The structure of the logs
 class Log(TypedDict):
@@ -15,27 +33,43 @@ class Log(TypedDict):
 
 # Failure Analysis Sub-graph
 class FailureAnalysisState(TypedDict):
-    cleaned_logs: List[Log]
-    failures: List[Log]
+    cleaned_logs: SharedRef
+    failures: LogBatch
     fa_summary: str
-    processed_logs: List[str]
+    processed_logs: ProcessedSet
 
 class FailureAnalysisOutputState(TypedDict):
     fa_summary: str
-    processed_logs: List[str]
+    processed_logs: ProcessedSet
 
-def get_failures(state):
+def get_failures(state, store: Optional[BaseStore] = None):
     """ Get logs that contain a failure """
-    cleaned_logs = state["cleaned_logs"]
-    failures = [log for log in cleaned_logs if "grade" in log]
+    cleaned_logs = resolve(state["cleaned_logs"], store)
+    failures = cleaned_logs.filter(cleaned_logs.failures())
     return {"failures": failures}
 
-def generate_summary(state):
+def format_cluster(cluster: dict) -> str:
+    log = cluster["representative"]
+    return (f"{cluster['count']} failures like:\n"
+            f"Question: {log['question']}\nGrade: {log.get('grade')} (by {log.get('grader')})\nFeedback: {log.get('feedback')}")
+
+def summarize_clusters(clusters: List[dict]) -> str:
+    """ One model call over cluster representatives and counts, whatever the number of failures behind them """
+    if not clusters:
+        return "No failures."
+    prompt = failure_summary_prompt.format(clusters="\n\n".join(format_cluster(cluster) for cluster in clusters))
+    return llm.invoke(prompt).content
+
+def generate_summary(state, config: RunnableConfig):
     """ Generate summary of failures """
     failures = state["failures"]
-    # Add fxn: fa_summary = summarize(failures)
-    fa_summary = "Poor quality retrieval of Chroma documentation."
-    return {"fa_summary": fa_summary, "processed_logs": [f"failure-analysis-on-log-{failure['id']}" for failure in failures]}
+    processed = ProcessedSet.from_ids("failure-analysis", failures.id.to_list())
+    configurable = configuration.Configuration.from_runnable_config(config)
+    if not configurable.summarize_failures:
+        return {"fa_summary": "", "processed_logs": processed}
+    # Only cluster representatives and counts reach the LLM, so the prompt size doesn't grow with the number of failures
+    clusters = cluster_failures(failures, configurable.failure_clusters)
+    return {"fa_summary": summarize_clusters(clusters), "processed_logs": processed}
 
 fa_builder = StateGraph(FailureAnalysisState,output_schema=FailureAnalysisOutputState)
 fa_builder.add_node("get_failures", get_failures)
@@ -46,20 +80,20 @@ fa_builder.add_edge("generate_summary", END)
 
 # Summarization subgraph
 class QuestionSummarizationState(TypedDict):
-    cleaned_logs: List[Log]
+    cleaned_logs: SharedRef
     qs_summary: str
     report: str
-    processed_logs: List[str]
+    processed_logs: ProcessedSet
 
 class QuestionSummarizationOutputState(TypedDict):
     report: str
-    processed_logs: List[str]
+    processed_logs: ProcessedSet
 
-def generate_summary(state):
-    cleaned_logs = state["cleaned_logs"]
+def generate_summary(state, store: Optional[BaseStore] = None):
+    cleaned_logs = resolve(state["cleaned_logs"], store)
     # Add fxn: summary = summarize(generate_summary)
     summary = "Questions focused on usage of ChatOllama and Chroma vector store."
-    return {"qs_summary": summary, "processed_logs": [f"summary-on-log-{log['id']}" for log in cleaned_logs]}
+    return {"qs_summary": summary, "processed_logs": ProcessedSet.from_ids("summary", cleaned_logs.id.to_list())}
 
 def send_to_slack(state):
     qs_summary = state["qs_summary"]
@@ -75,21 +109,29 @@ qs_builder.add_edge("generate_summary", "send_to_slack")
 qs_builder.add_edge("send_to_slack", END)
 
 # Entry Graph
+# Checkpointers need checkpoint_serde.checkpoint_serde() to load ProcessedSet, LogBatch and SharedRef values
 class EntryGraphState(TypedDict):
     raw_logs: List[Log]
-    cleaned_logs: List[Log]
+    cleaned_logs: SharedRef # Read-only LogBatch both sub-graphs read by reference instead of each checkpointing a copy
     fa_summary: str # This will only be generated in the FA sub-graph
     report: str # This will only be generated in the QS sub-graph
-    processed_logs:  Annotated[List[int], add] # This will be generated in BOTH sub-graphs
+    processed_logs:  Annotated[ProcessedSet, merge_processed] # This will be generated in BOTH sub-graphs
 
-def clean_logs(state):
+def clean_logs(state, config: RunnableConfig, store: Optional[BaseStore] = None):
     # Get logs
     raw_logs = state["raw_logs"]
-    # Data cleaning raw_logs -> docs 
-    cleaned_logs = raw_logs
-    return {"cleaned_logs": cleaned_logs}
-
-entry_builder = StateGraph(EntryGraphState)
+    batch = raw_logs if isinstance(raw_logs, LogBatch) else LogBatch.from_logs(raw_logs)
+    # Data cleaning raw_logs -> docs, spread over worker processes for large batches
+    configurable = configuration.Configuration.from_runnable_config(config)
+    if configurable.clean_workers > 1 and len(batch) > configurable.clean_chunk_size:
+        cleaned_logs = map_in_processes(clean_batch, batch, configurable.clean_workers, configurable.clean_chunk_size)
+    else:
+        cleaned_logs = clean_batch(batch)
+    # With a checkpointer, the cleaned batch is persisted once to the graph's store (or the file blob store), so the
+    # handle survives restarts and replays; shared_state.collect_garbage removes it once no checkpoint refers to it
+    return {"cleaned_logs": share(cleaned_logs, store, config)}
+
+entry_builder = StateGraph(EntryGraphState, config_schema=configuration.Configuration)
 entry_builder.add_node("clean_logs", clean_logs)
 entry_builder.add_node("question_summarization", qs_builder.compile())
 entry_builder.add_node("failure_analysis", fa_builder.compile())
@@ -0,0 +1,22 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from pydantic import TypeAdapter
+
+import sub_graphs
+from log_batch import LogBatch
+from processed_set import ProcessedSet
+
+def test_graph_schemas_generate():
+    for builder in (sub_graphs.entry_builder, sub_graphs.fa_builder, sub_graphs.qs_builder):
+        graph = builder.compile()
+        assert graph.get_input_jsonschema()["properties"]
+        assert graph.get_output_jsonschema()["properties"]
+
+def test_columnar_state_round_trips_through_pydantic():
+    processed = TypeAdapter(ProcessedSet).validate_python(ProcessedSet.from_ids("s", ["1", "2", "x"]).to_dict())
+    assert processed.contains("s", "2") and processed.contains("s", "x")
+    logs = [{"id": "1", "question": "q", "docs": None, "answer": "a", "grade": 0}]
+    batch = TypeAdapter(LogBatch).validate_python(logs)
+    assert isinstance(batch, LogBatch) and TypeAdapter(LogBatch).dump_python(batch) == logs
@@ -0,0 +1,15 @@
+from processed_set import ProcessedSet
+
+IDS = ["7", "007", "+8", "-0", "x1"]
+
+def test_non_canonical_ids_stay_distinct():
+    processed = ProcessedSet.from_ids("s", IDS)
+    assert len(processed) == len(IDS)
+    assert all(processed.contains("s", log_id) for log_id in IDS)
+    assert not processed.contains("s", "8") and not processed.contains("s", "0")
+    assert processed.contains_many("s", IDS + ["8", "0"]).tolist() == [True] * len(IDS) + [False, False]
+
+def test_canonical_ids_coalesce_into_runs():
+    processed = ProcessedSet.from_ids("s", [str(i) for i in range(1000)])
+    assert processed.runs["s"].tolist() == [[0, 1000]] and not processed.extra
+    assert processed.contains_many("s", ["999", "1000", "0999"]).tolist() == [True, False, False]
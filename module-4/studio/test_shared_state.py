@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+STUDIO = os.path.dirname(os.path.abspath(__file__))
+
+RUN = textwrap.dedent("""
+    import sqlite3, sys
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    from checkpoint_serde import checkpoint_serde
+    from sub_graphs import entry_builder
+
+    g = entry_builder.compile(checkpointer=SqliteSaver(sqlite3.connect(sys.argv[1], check_same_thread=False), serde=checkpoint_serde()))
+    logs = [{"id": str(i), "question": f"How do I use Chroma {i}?", "docs": None, "answer": "..."} for i in range(5)]
+    g.invoke({"raw_logs": logs}, {"configurable": {"thread_id": "1"}})
+""")
+
+REPLAY = textwrap.dedent("""
+    import sqlite3, sys
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    from checkpoint_serde import checkpoint_serde
+    from sub_graphs import entry_builder
+
+    g = entry_builder.compile(checkpointer=SqliteSaver(sqlite3.connect(sys.argv[1], check_same_thread=False), serde=checkpoint_serde()))
+    config = {"configurable": {"thread_id": "1"}}
+    after_clean = next(s for s in g.get_state_history(config) if s.next and "clean_logs" not in s.next and s.metadata["step"] == 1)
+    result = g.invoke(None, after_clean.config)
+    assert len(result["processed_logs"]) == 5, result
+    assert type(g.get_state(config).values["processed_logs"]).__name__ == "ProcessedSet"
+    print("replayed")
+""")
+
+def run(script: str, *args: str, env: dict) -> str:
+    result = subprocess.run([sys.executable, "-c", script, *args], cwd=STUDIO, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+def test_replay_after_clean_logs_in_a_new_process(tmp_path):
+    """ A SharedRef checkpointed by one process resolves in another, e.g. after a restart.
+
+    Runs under LANGGRAPH_STRICT_MSGPACK, so the state types must load through checkpoint_serde's allowlist.
+    """
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-test"),
+           "SHARED_BLOB_DIR": str(tmp_path / "blobs"), "LANGGRAPH_STRICT_MSGPACK": "true"}
+    db = str(tmp_path / "checkpoints.db")
+    run(RUN, db, env=env)
+    assert "replayed" in run(REPLAY, db, env=env)
+
+def test_nothing_is_persisted_without_a_checkpointer(tmp_path, monkeypatch):
+    import shared_state
+    from log_batch import LogBatch
+
+    monkeypatch.setattr(shared_state, "blob_store", shared_state.FileBlobStore(str(tmp_path)))
+    ref = shared_state.share(LogBatch.from_logs([{"id": "1", "question": "q"}]))
+    assert ref.get().id.to_list() == ["1"]
+    assert not list(tmp_path.iterdir())
+
+def test_blobs_are_not_unpickled(tmp_path, monkeypatch):
+    import pickle
+    import shared_state
+
+    class Boom:
+        def __reduce__(self):
+            return (os.system, ("touch " + str(tmp_path / "pwned"),))
+
+    monkeypatch.setattr(shared_state, "blob_store", shared_state.FileBlobStore(str(tmp_path)))
+    (tmp_path / "planted").write_bytes(pickle.dumps(Boom()))
+    with pytest.raises(Exception):
+        shared_state.SharedRef("planted").get()
+    assert not (tmp_path / "pwned").exists()
+
+def test_collect_garbage_keeps_only_referenced_blobs(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", os.environ.get("OPENAI_API_KEY", "sk-test"))
+    from langgraph.checkpoint.memory import MemorySaver
+    import shared_state
+    from checkpoint_serde import checkpoint_serde
+    from sub_graphs import entry_builder
+
+    monkeypatch.setattr(shared_state, "blob_store", shared_state.FileBlobStore(str(tmp_path)))
+    checkpointer = MemorySaver(serde=checkpoint_serde())
+    graph = entry_builder.compile(checkpointer=checkpointer)
+    for thread in ("1", "2"):
+        logs = [{"id": str(i), "question": f"Thread {thread} question {i}", "docs": None, "answer": "..."} for i in range(3)]
+        graph.invoke({"raw_logs": logs}, {"configurable": {"thread_id": thread}})
+    assert len(list(tmp_path.iterdir())) == 2
+
+    checkpointer.delete_thread("1")
+    assert shared_state.collect_garbage(checkpointer, grace_seconds=60) == 0
+    assert shared_state.collect_garbage(checkpointer, grace_seconds=0) == 1
+    kept = graph.get_state({"configurable": {"thread_id": "2"}}).values["cleaned_logs"]
+    assert [blob.name for blob in tmp_path.iterdir()] == [kept.key]
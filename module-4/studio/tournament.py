@@ -0,0 +1,38 @@
+from typing import Callable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+def tournament_reduce(
+    items: Sequence[T],
+    pick_in_groups: Callable[[List[List[T]]], List[int]],
+    group_size: int = 8,
+) -> int:
+    """ Select a single winner from items by reducing fixed-size groups in rounds.
+
+    pick_in_groups receives every contested group of a round at once (so the caller can run them in
+    parallel) and returns the local index of each group's winner. Singleton groups advance without
+    a call, and out-of-range picks fall back to the first item of the group. Returns the index of the
+    overall winner in items; the number of rounds grows with log(len(items)) / log(group_size).
+    """
+    if not items:
+        raise ValueError("Cannot select a winner from an empty list")
+    group_size = max(2, group_size)
+    survivors = list(range(len(items)))
+
+    while len(survivors) > 1:
+        groups = [survivors[i:i + group_size] for i in range(0, len(survivors), group_size)]
+        contested = [g for g in groups if len(g) > 1]
+        picks = iter(pick_in_groups([[items[j] for j in g] for g in contested]))
+
+        next_round = []
+        for group in groups:
+            if len(group) == 1:
+                next_round.append(group[0])
+                continue
+            local = next(picks)
+            if not 0 <= local < len(group):
+                local = 0
+            next_round.append(group[local])
+        survivors = next_round
+
+    return survivors[0]